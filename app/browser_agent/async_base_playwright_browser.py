@@ -0,0 +1,287 @@
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Dict, Optional
+from playwright.async_api import (
+    async_playwright,
+    Browser as PlaywrightBrowser,
+    BrowserContext,
+    Locator,
+    Page,
+)
+from app.utils import BLOCKED_URL_RE
+from app.browser_agent.base_playwright_browser import (
+    CHAINABLE_ACTIONS,
+    CUA_KEY_TO_PLAYWRIGHT_KEY,
+    FAST_SCREENSHOT_QUALITY,
+    LOAD_STATES,
+    SCREENSHOT_UNCHANGED,
+    parse_selector,
+)
+from app.browser_agent.helpers import b64, is_single_press
+
+
+class AsyncBasePlaywrightBrowser:
+    """
+    Async counterpart of `BasePlaywrightBrowser` built on `async_playwright`:
+
+      - Subclasses override `_get_browser_and_page()` to launch or connect,
+        returning (PlaywrightBrowser, Page).
+      - Used as an async context manager (`async with`); all actions are coroutines.
+      - `new_context_page()` hands out pages in separate BrowserContexts of the
+        same browser process, so several jobs can run concurrently.
+    """
+
+    dimensions = (1024, 768)
+
+    def __init__(self):
+        self._playwright = None
+        self._browser: PlaywrightBrowser | None = None
+        self._page: Page | None = None
+        self._last_screenshot_hash: bytes | None = None
+
+    async def __aenter__(self):
+        # Start Playwright and call the subclass hook for getting browser/page
+        self._playwright = await async_playwright().start()
+        self._browser, self._page = await self._get_browser_and_page()
+        await self._setup_page(self._page)
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def _setup_page(self, page: Page) -> None:
+        """Install URL blocking on a newly created page."""
+        # Matched inside the Playwright driver, so only blocked requests reach the handler
+        async def handle_blocked(route, request):
+            print(f"Flagging blocked domain: {request.url}")
+            await route.abort()
+
+        await page.route(BLOCKED_URL_RE, handle_blocked)
+
+    @asynccontextmanager
+    async def new_context_page(self, **context_options) -> AsyncIterator[Page]:
+        """Yield a page in a fresh BrowserContext, closing the context on exit.
+
+        Unlike the sync browser, this does not replace the browser's current
+        page: concurrent jobs each drive the page they were given.
+
+        Args:
+            **context_options: Extra keyword arguments for `Browser.new_context()`
+        """
+        context = await self._new_context(**context_options)
+        try:
+            page = await context.new_page()
+            await self._setup_page(page)
+            yield page
+        finally:
+            await context.close()
+
+    @property
+    def page(self) -> Page:
+        """The active Playwright page, for callers that need native waits or locators."""
+        return self._page
+
+    def get_current_url(self) -> str:
+        return self._page.url
+
+    # --- Common "Computer" actions ---
+    async def screenshot(self, skip_unchanged: bool = False, fast: bool = True) -> str:
+        """Capture only the viewport (not full_page) as a base64-encoded image.
+
+        Args:
+            skip_unchanged: Return SCREENSHOT_UNCHANGED instead of the image when
+                the capture is byte-identical to the previous one
+            fast: Capture a JPEG instead of a lossless PNG
+        """
+        if fast:
+            image_bytes = await self._page.screenshot(
+                full_page=False,
+                type="jpeg",
+                quality=FAST_SCREENSHOT_QUALITY,
+                animations="disabled",
+                caret="hide",
+            )
+        else:
+            image_bytes = await self._page.screenshot(full_page=False)
+        digest = hashlib.sha256(image_bytes).digest()
+        unchanged = digest == self._last_screenshot_hash
+        self._last_screenshot_hash = digest
+        if skip_unchanged and unchanged:
+            return SCREENSHOT_UNCHANGED
+        return b64.b64encode(image_bytes).decode("ascii")
+
+    async def click(self, x: int, y: int, button: str = "left") -> None:
+        self._last_screenshot_hash = None
+        match button:
+            case "back":
+                await self.back()
+            case "forward":
+                await self.forward()
+            case "wheel":
+                await self._page.mouse.wheel(x, y)
+            case _:
+                button_mapping = {"left": "left", "right": "right"}
+                button_type = button_mapping.get(button, "left")
+                await self._page.mouse.click(x, y, button=button_type)
+
+    async def click_selector(self, selector: str, button: str = "left") -> None:
+        """Click on an element using a CSS, XPath, or Playwright locator-style selector."""
+        button_mapping = {"left": "left", "right": "right"}
+        button_type = button_mapping.get(button, "left")
+
+        kind, target, _ = parse_selector(selector)
+        if kind == "raw":
+            await self._page.click(target, button=button_type)
+        else:
+            await self._locator(selector).click(button=button_type)
+
+    async def double_click(self, x: int, y: int) -> None:
+        await self._page.mouse.dblclick(x, y)
+
+    async def scroll(self, x: int, y: int, scroll_x: int, scroll_y: int) -> None:
+        await self._page.mouse.move(x, y)
+        await self._page.evaluate(f"window.scrollBy({scroll_x}, {scroll_y})")
+
+    async def type(self, text: str) -> None:
+        await self._page.keyboard.type(text)
+
+    async def wait(self, ms: int = 1000) -> None:
+        await asyncio.sleep(ms / 1000)
+
+    async def wait_for_selector(self, selector: str, timeout: Optional[int] = None) -> bool:
+        """Wait for a selector to appear in the page.
+
+        Args:
+            selector: CSS or XPath selector, or Playwright locator-style selector
+            timeout: Maximum time to wait in milliseconds, None for default browser timeout
+
+        Returns:
+            True if the selector appeared, False if it timed out
+        """
+        try:
+            timeout_ms = timeout if timeout is not None else 30000  # 30 seconds default
+
+            kind, target, _ = parse_selector(selector)
+            if kind == "raw":
+                await self._page.wait_for_selector(target, timeout=timeout_ms)
+            else:
+                await self._locator(selector).first.wait_for(timeout=timeout_ms)
+            return True
+        except Exception as e:
+            print(f"Selector error: {e}")
+            return False
+
+    async def wait_for(self, selector_or_state: str, timeout: Optional[int] = None) -> bool:
+        """Wait for a page load state or a selector; see `BasePlaywrightBrowser.wait_for`."""
+        if selector_or_state in LOAD_STATES:
+            return await self.wait_for_load_state(selector_or_state, timeout=timeout)
+        return await self.wait_for_selector(selector_or_state, timeout=timeout)
+
+    async def wait_for_load_state(self, state: str = "networkidle", timeout: Optional[int] = None) -> bool:
+        """Wait for the page to reach a load state.
+
+        Args:
+            state: One of "load", "domcontentloaded" or "networkidle"
+            timeout: Maximum time to wait in milliseconds, None for default browser timeout
+
+        Returns:
+            True if the state was reached, False if it timed out
+        """
+        try:
+            await self._page.wait_for_load_state(state, timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def _locator(self, selector: str) -> Locator:
+        """Build a Playwright Locator for a role or data-testid selector."""
+        kind, target, extra = parse_selector(selector)
+        if kind == "role":
+            if extra is None:
+                return self._page.get_by_role(target)
+            return self._page.get_by_role(target, name=extra)
+        if kind == "testid":
+            locator = self._page.locator(f"[data-testid='{target}']")
+            return locator.locator(extra) if extra else locator
+        return self._page.locator(target)
+
+    async def move(self, x: int, y: int) -> None:
+        await self._page.mouse.move(x, y)
+
+    async def chain(self, actions: List[Dict[str, Any]], settle_timeout: Optional[int] = 1500) -> None:
+        """Run several actions back-to-back and wait once for the page to settle.
+
+        See `BasePlaywrightBrowser.chain` for the action format.
+        """
+        for action in actions:
+            params = dict(action)
+            action_type = params.pop("type")
+            if action_type not in CHAINABLE_ACTIONS:
+                raise ValueError(f"Unsupported chain action: {action_type}")
+            await getattr(self, action_type)(**params)
+
+        if settle_timeout is not None:
+            # Pages with long-polling connections may never go idle, so a timeout is fine
+            await self.wait_for_load_state("networkidle", timeout=settle_timeout)
+
+    async def keypress(self, keys: List[str]) -> None:
+        mapped_keys = [CUA_KEY_TO_PLAYWRIGHT_KEY.get(key.lower(), key) for key in keys]
+        if is_single_press(mapped_keys):
+            # One driver call instead of a down/up pair per key
+            await self._page.keyboard.press("+".join(mapped_keys))
+            return
+        for key in mapped_keys:
+            await self._page.keyboard.down(key)
+        for key in reversed(mapped_keys):
+            await self._page.keyboard.up(key)
+
+    async def drag(self, path: List[Dict[str, int]]) -> None:
+        if not path:
+            return
+        await self._page.mouse.move(path[0]["x"], path[0]["y"])
+        await self._page.mouse.down()
+        for point in path[1:]:
+            await self._page.mouse.move(point["x"], point["y"])
+        await self._page.mouse.up()
+
+    # --- Extra browser-oriented actions ---
+    async def goto(self, url: str) -> None:
+        self._last_screenshot_hash = None
+        try:
+            return await self._page.goto(url)
+        except Exception as e:
+            print(f"Error navigating to {url}: {e}")
+
+    async def back(self) -> None:
+        self._last_screenshot_hash = None
+        return await self._page.go_back()
+
+    async def forward(self) -> None:
+        self._last_screenshot_hash = None
+        return await self._page.go_forward()
+
+    async def get_page_html(self) -> str:
+        """Get the HTML content of the current page."""
+        return await self._page.content()
+
+    async def fill_form(self, selector: str, value: str) -> None:
+        """Fill a form field with the given value."""
+        await self._page.fill(selector, value)
+
+    async def extract_text(self, selector: str = "body") -> str:
+        """Extract text content from an element."""
+        return await self._page.text_content(selector) or ""
+
+    # --- Subclass hooks ---
+    async def _get_browser_and_page(self) -> tuple[PlaywrightBrowser, Page]:
+        """Subclasses must implement, returning (PlaywrightBrowser, Page)."""
+        raise NotImplementedError
+
+    async def _new_context(self, **context_options) -> BrowserContext:
+        """Create a BrowserContext on the running browser; subclasses may add defaults."""
+        return await self._browser.new_context(**context_options)
@@ -0,0 +1,45 @@
+from typing import Optional
+from playwright.async_api import Browser as PlaywrightBrowser, BrowserContext, Page
+from .async_base_playwright_browser import AsyncBasePlaywrightBrowser
+from .local_playwright import IGNORED_DEFAULT_ARGS, PERFORMANCE_ARGS
+
+
+class AsyncLocalPlaywrightBrowser(AsyncBasePlaywrightBrowser):
+    """Launches a local Chromium instance using Playwright's async API."""
+
+    def __init__(self, headless: bool = False, start_url: Optional[str] = None):
+        """
+        Args:
+            headless: Whether to run the browser without a window
+            start_url: Page to open at launch; None leaves the tab on about:blank
+        """
+        super().__init__()
+        self.headless = headless
+        self.start_url = start_url
+
+    async def _get_browser_and_page(self) -> tuple[PlaywrightBrowser, Page]:
+        width, height = self.dimensions
+        launch_args = [f"--window-size={width},{height}", "--disable-extensions", "--disable-file-system",
+                       *PERFORMANCE_ARGS]
+        browser = await self._playwright.chromium.launch(
+            chromium_sandbox=True,
+            headless=self.headless,
+            args=launch_args,
+            ignore_default_args=IGNORED_DEFAULT_ARGS,
+            env={"DISPLAY": ":0"}
+        )
+
+        self._browser = browser
+        context = await self._new_context()
+        page = await context.new_page()
+        if self.start_url:
+            await page.goto(self.start_url)
+
+        return browser, page
+
+    async def _new_context(self, **context_options) -> BrowserContext:
+        """Create a download-enabled context sized to `dimensions`."""
+        width, height = self.dimensions
+        context_options.setdefault("accept_downloads", True)
+        context_options.setdefault("viewport", {"width": width, "height": height})
+        return await self._browser.new_context(**context_options)
@@ -1,9 +1,21 @@
+import re
 import time
-import base64
-from typing import List, Dict, Literal, Optional
-from playwright.sync_api import sync_playwright, Browser as PlaywrightBrowser, Page
-from app.utils import check_blocklisted_url
+import hashlib
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Dict, Literal, Optional, Tuple
+from playwright.sync_api import (
+    sync_playwright,
+    Browser as PlaywrightBrowser,
+    BrowserContext,
+    CDPSession,
+    Locator,
+    Page,
+)
+from urllib.parse import urlsplit
+from app.utils import BLOCKED_URL_RE
 from app.browser_agent.browser import Browser
+from app.browser_agent.helpers import b64, is_single_press
+from app.memory.selector_memory import SelectorMemory
 
 # Optional: key mapping if your model uses "CUA" style keys
 CUA_KEY_TO_PLAYWRIGHT_KEY = {
@@ -34,6 +46,78 @@ CUA_KEY_TO_PLAYWRIGHT_KEY = {
     "win": "Meta",
 }
 
+# JPEG quality for fast screenshots; agents only need a lossy preview of the viewport
+FAST_SCREENSHOT_QUALITY = 60
+
+# Returned by `screenshot(skip_unchanged=True)` when the viewport hasn't changed
+SCREENSHOT_UNCHANGED = "UNCHANGED"
+
+# Arguments to `wait_for()` that name a page load state rather than a selector
+LOAD_STATES = frozenset({"load", "domcontentloaded", "networkidle"})
+
+# Selector forms handled with Playwright's locator API instead of raw CSS/XPath
+_ROLE_RE = re.compile(r"role=([^\[]+)(?:\[name='([^']*)'\])?")
+_TESTID_RE = re.compile(r"data-testid=([^>]+?)\s*(?:>>\s*(.+))?")
+# Attribute-style selector emitted by Playwright recordings for Metabase's SQL query link
+_RECORDED_SQL_LINK = "[role='link'][name='sql icon SQL query']"
+
+
+def parse_selector(selector: str) -> Tuple[str, str, Optional[str]]:
+    """Classify a selector string.
+    
+    Returns:
+        ("role", role, name) for role=ROLE[name='NAME'] selectors (name may be None),
+        ("testid", value, nested) for data-testid=VALUE >> NESTED selectors (nested may be None),
+        or ("raw", selector, None) for anything else
+    """
+    match = _ROLE_RE.fullmatch(selector)
+    if match:
+        return ("role", match.group(1), match.group(2))
+    if _RECORDED_SQL_LINK in selector:
+        return ("role", "link", "sql icon SQL query")
+    match = _TESTID_RE.fullmatch(selector)
+    if match:
+        return ("testid", match.group(1).strip(), match.group(2).strip() if match.group(2) else None)
+    return ("raw", selector, None)
+
+
+# Helpers installed into every document so repeated evaluate() calls send only a function call
+AGENT_HELPERS_SCRIPT = """
+window.__agent = {
+    info(selector) {
+        const el = document.querySelector(selector);
+        if (!el) return null;
+        
+        const attributes = {};
+        for (const attr of el.attributes) {
+            attributes[attr.name] = attr.value;
+        }
+        
+        return {
+            tag: el.tagName.toLowerCase(),
+            text: el.innerText,
+            html: el.innerHTML,
+            attributes: attributes,
+            isVisible: el.offsetWidth > 0 && el.offsetHeight > 0,
+            boundingBox: el.getBoundingClientRect().toJSON()
+        };
+    }
+};
+"""
+
+
+# Browser methods that may appear as steps in `chain()`
+CHAINABLE_ACTIONS = frozenset({
+    "click",
+    "click_selector",
+    "double_click",
+    "fill_form",
+    "keypress",
+    "move",
+    "scroll",
+    "type",
+})
+
 
 class BasePlaywrightBrowser(Browser):
     """
@@ -44,31 +128,27 @@ class BasePlaywrightBrowser(Browser):
       - This base class handles context creation (`__enter__`/`__exit__`),
         plus standard browser actions like click, scroll, etc.
       - Provides browser navigation with `goto(url)`, `back()`, and `forward()`.
+      - Optionally remembers resolved locators per page in a `SelectorMemory`
+        so `click_selector` can skip parsing for selectors that worked before.
     """
 
     dimensions = (1024, 768)
 
-    def __init__(self):
+    def __init__(self, selector_memory: Optional[SelectorMemory] = None):
+        self._selector_memory = selector_memory
         self._playwright = None
         self._browser: PlaywrightBrowser | None = None
         self._page: Page | None = None
+        self._sel_cache: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        self._last_screenshot_hash: bytes | None = None
+        self._cdp_session: CDPSession | None = None
+        self._cdp_page: Page | None = None
 
     def __enter__(self):
         # Start Playwright and call the subclass hook for getting browser/page
         self._playwright = sync_playwright().start()
         self._browser, self._page = self._get_browser_and_page()
-
-        # Set up network interception to flag URLs matching domains in BLOCKED_DOMAINS
-        def handle_route(route, request):
-            url = request.url
-            try:
-                check_blocklisted_url(url)
-                route.continue_()
-            except ValueError as e:
-                print(f"Flagging blocked domain: {url}")
-                route.abort()
-
-        self._page.route("**/*", handle_route)
+        self._setup_page(self._page)
 
         return self
 
@@ -78,16 +158,103 @@ class BasePlaywrightBrowser(Browser):
         if self._playwright:
             self._playwright.stop()
 
+    @property
+    def page(self) -> Page:
+        """The active Playwright page, for callers that need native waits or locators."""
+        return self._page
+
+    def _setup_page(self, page: Page) -> None:
+        """Install URL blocking and navigation tracking on a newly created page."""
+        # Abort requests to domains in BLOCKED_DOMAINS. The URL pattern is matched inside the
+        # Playwright driver, so only blocked requests are ever sent to this handler.
+        def handle_blocked(route, request):
+            print(f"Flagging blocked domain: {request.url}")
+            route.abort()
+
+        page.route(BLOCKED_URL_RE, handle_blocked)
+        # Compiled once per document instead of sending the source with every call
+        page.add_init_script(AGENT_HELPERS_SCRIPT)
+        self._watch_navigation(page)
+
+    @contextmanager
+    def new_context_page(self, **context_options) -> Iterator[Page]:
+        """Temporarily switch to a page in a fresh BrowserContext.
+        
+        The context reuses the running browser process but has its own cookies
+        and storage. It is closed, and the previous page restored, on exit.
+        
+        Args:
+            **context_options: Extra keyword arguments for `Browser.new_context()`
+        """
+        previous_page = self._page
+        context = self._new_context(**context_options)
+        try:
+            self._page = context.new_page()
+            self._setup_page(self._page)
+            yield self._page
+        finally:
+            context.close()
+            self._page = previous_page
+
+    def _watch_navigation(self, page: Page) -> None:
+        """Forget the last screenshot whenever the page's main frame navigates."""
+        def handle_navigation(frame):
+            if frame == page.main_frame:
+                self._invalidate_screenshot()
+
+        page.on("framenavigated", handle_navigation)
+
+    def _invalidate_screenshot(self) -> None:
+        """Make the next screenshot always return an image, even if it matches the previous one."""
+        self._last_screenshot_hash = None
+
     def get_current_url(self) -> str:
         return self._page.url
 
     # --- Common "Computer" actions ---
-    def screenshot(self) -> str:
-        """Capture only the viewport (not full_page)."""
-        png_bytes = self._page.screenshot(full_page=False)
-        return base64.b64encode(png_bytes).decode("utf-8")
+    def screenshot_bytes(self, fast: bool = True) -> bytes:
+        """Capture only the viewport (not full_page) as raw image bytes.
+        
+        Args:
+            fast: Capture a JPEG encoded for speed instead of a lossless PNG
+        """
+        if not fast:
+            return self._page.screenshot(full_page=False)
+        try:
+            result = self._get_cdp_session().send("Page.captureScreenshot", {
+                "format": "jpeg",
+                "quality": FAST_SCREENSHOT_QUALITY,
+                "optimizeForSpeed": True,
+            })
+            return b64.b64decode(result["data"])
+        except Exception:
+            # CDP is Chromium-only; other engines still get a JPEG, just without optimizeForSpeed
+            return self._page.screenshot(
+                full_page=False,
+                type="jpeg",
+                quality=FAST_SCREENSHOT_QUALITY,
+                animations="disabled",
+                caret="hide",
+            )
+
+    def screenshot(self, skip_unchanged: bool = False, fast: bool = True) -> str:
+        """Capture only the viewport (not full_page) as a base64-encoded image.
+        
+        Args:
+            skip_unchanged: Return SCREENSHOT_UNCHANGED instead of the image when
+                the capture is byte-identical to the previous one
+            fast: Capture a JPEG encoded for speed instead of a lossless PNG
+        """
+        image_bytes = self.screenshot_bytes(fast=fast)
+        digest = hashlib.sha256(image_bytes).digest()
+        unchanged = digest == self._last_screenshot_hash
+        self._last_screenshot_hash = digest
+        if skip_unchanged and unchanged:
+            return SCREENSHOT_UNCHANGED
+        return b64.b64encode(image_bytes).decode("ascii")
 
     def click(self, x: int, y: int, button: str = "left") -> None:
+        self._invalidate_screenshot()
         match button:
             case "back":
                 self.back()
@@ -105,44 +272,29 @@ class BasePlaywrightBrowser(Browser):
         button_mapping = {"left": "left", "right": "right"}
         button_type = button_mapping.get(button, "left")
         
-        # Handle Playwright's role-based selectors
-        if selector.startswith("role="):
-            # Extract role type and parameters
-            role_parts = selector[5:].split("[", 1)
-            role_type = role_parts[0]
-            
-            if len(role_parts) > 1 and role_parts[1].endswith("]"):
-                # Extract name parameter
-                params = role_parts[1][:-1].split("=", 1)
-                if len(params) > 1 and params[0] == "name" and params[1].startswith("'") and params[1].endswith("'"):
-                    name = params[1][1:-1]
-                    # Use the locator API for role-based selection
-                    self._page.get_by_role(role_type, name=name).click(button=button_type)
-                    return
-        # Handle specific SQL query selector
-        elif "[role='link'][name='sql icon SQL query']" in selector:
+        kind, target, _ = self._parse_selector(selector)
+        if kind == "raw":
+            self._page.click(target, button=button_type)
+            return
+        
+        if self._selector_memory is None:
+            self._locator(selector).click(button=button_type)
+            return
+        
+        # Key on the URL before clicking, since the click may navigate
+        page_key = self._selector_page_key()
+        cached = self._selector_memory.get_selector(page_key, selector)
+        if cached:
             try:
-                # Use the get_by_role API directly
-                self._page.get_by_role("link", name="sql icon SQL query").click(button=button_type)
+                self._page.locator(cached).click(button=button_type, timeout=2000)
+                self._selector_memory.update_selector(page_key, selector, cached, success=True)
                 return
             except Exception:
-                # Fall back to CSS selector
-                pass
-        elif selector.startswith("data-testid="):
-            # Parse data-testid selector
-            parts = selector.split("=", 1)
-            if len(parts) > 1:
-                value = parts[1]
-                # Handle nested selectors
-                if ">>" in value:
-                    main_part, sub_part = value.split(">>", 1)
-                    self._page.locator(f"[data-testid='{main_part.strip()}']").locator(sub_part.strip()).click(button=button_type)
-                else:
-                    self._page.locator(f"[data-testid='{value}']").click(button=button_type)
-                return
-                
-        # Default to standard selector
-        self._page.click(selector, button=button_type)
+                # Evict the stale entry; only a locator that works gets stored again
+                self._selector_memory.forget_selector(page_key, selector)
+        
+        self._locator(selector).click(button=button_type)
+        self._selector_memory.update_selector(page_key, selector, self._locator_string(selector), success=True)
 
     def double_click(self, x: int, y: int) -> None:
         self._page.mouse.dblclick(x, y)
@@ -170,45 +322,129 @@ class BasePlaywrightBrowser(Browser):
         try:
             timeout_ms = timeout if timeout is not None else 30000  # 30 seconds default
             
-            # Handle Playwright's role-based selectors
-            if selector.startswith("role="):
-                # Extract role type and parameters
-                role_parts = selector[5:].split("[", 1)
-                role_type = role_parts[0]
-                
-                if len(role_parts) > 1 and role_parts[1].endswith("]"):
-                    # Extract name parameter
-                    params = role_parts[1][:-1].split("=", 1)
-                    if len(params) > 1 and params[0] == "name" and params[1].startswith("'") and params[1].endswith("'"):
-                        name = params[1][1:-1]
-                        # Use the locator API for role-based selection
-                        self._page.get_by_role(role_type, name=name).wait_for(timeout=timeout_ms)
-                        return True
+            kind, target, _ = self._parse_selector(selector)
+            if kind == "raw":
+                self._page.wait_for_selector(target, timeout=timeout_ms)
             else:
-                # For selectors from PlayWright recording that use attributes 
-                if "[role='link'][name='sql icon SQL query']" in selector:
-                    try:
-                        # Use the get_by_role API directly
-                        self._page.get_by_role("link", name="sql icon SQL query").wait_for(timeout=timeout_ms)
-                        return True
-                    except Exception:
-                        # Fall back to CSS selector
-                        pass
-                        
-                # Standard CSS selector
-                self._page.wait_for_selector(selector, timeout=timeout_ms)
-                return True
-                
-            return False
+                self._locator(selector).first.wait_for(timeout=timeout_ms)
+            return True
         except Exception as e:
             print(f"Selector error: {e}")
             return False
 
+    def wait_for(self, selector_or_state: str, timeout: Optional[int] = None) -> bool:
+        """Wait for a page load state or a selector, returning as soon as it's reached.
+        
+        Args:
+            selector_or_state: A name in LOAD_STATES, or a selector as for `wait_for_selector()`
+            timeout: Maximum time to wait in milliseconds, None for default browser timeout
+            
+        Returns:
+            True if the state was reached or the selector appeared, False if it timed out
+        """
+        if selector_or_state in LOAD_STATES:
+            return self.wait_for_load_state(selector_or_state, timeout=timeout)
+        return self.wait_for_selector(selector_or_state, timeout=timeout)
+
+    def _get_cdp_session(self) -> CDPSession:
+        """Return a CDP session for the current page, creating one when the page changes."""
+        if self._cdp_session is None or self._cdp_page is not self._page:
+            self._cdp_session = self._page.context.new_cdp_session(self._page)
+            self._cdp_page = self._page
+        return self._cdp_session
+
+    def _parse_selector(self, selector: str) -> Tuple[str, str, Optional[str]]:
+        """Parse a selector string, memoizing the result per browser instance."""
+        parsed = self._sel_cache.get(selector)
+        if parsed is None:
+            parsed = parse_selector(selector)
+            self._sel_cache[selector] = parsed
+        return parsed
+
+    def _selector_page_key(self) -> str:
+        """Identify the current page for selector memory, ignoring query string and fragment."""
+        parts = urlsplit(self._page.url)
+        return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+    def _locator_string(self, selector: str) -> str:
+        """Express a role or data-testid selector in Playwright's native selector syntax."""
+        kind, target, extra = self._parse_selector(selector)
+        if kind == "role":
+            if extra is None:
+                return f"role={target}"
+            # Backslashes and double quotes in the name would end the quoted value early
+            name = extra.replace("\\", "\\\\").replace('"', '\\"')
+            return f'role={target}[name="{name}"]'
+        if kind == "testid":
+            locator = f"[data-testid='{target}']"
+            return f"{locator} >> {extra}" if extra else locator
+        return target
+
+    def locator(self, selector: str) -> Locator:
+        """Build a Playwright Locator for any selector form `click_selector()` accepts."""
+        return self._locator(selector)
+
+    def _locator(self, selector: str) -> Locator:
+        """Build a Playwright Locator for a role or data-testid selector."""
+        kind, target, extra = self._parse_selector(selector)
+        if kind == "role":
+            if extra is None:
+                return self._page.get_by_role(target)
+            return self._page.get_by_role(target, name=extra)
+        if kind == "testid":
+            locator = self._page.locator(f"[data-testid='{target}']")
+            return locator.locator(extra) if extra else locator
+        return self._page.locator(target)
+
+    def wait_for_load_state(self, state: str = "networkidle", timeout: Optional[int] = None) -> bool:
+        """Wait for the page to reach a load state.
+        
+        Args:
+            state: One of "load", "domcontentloaded" or "networkidle"
+            timeout: Maximum time to wait in milliseconds, None for default browser timeout
+            
+        Returns:
+            True if the state was reached, False if it timed out
+        """
+        try:
+            self._page.wait_for_load_state(state, timeout=timeout)
+            return True
+        except Exception:
+            return False
+
     def move(self, x: int, y: int) -> None:
         self._page.mouse.move(x, y)
 
+    def chain(self, actions: List[Dict[str, Any]], settle_timeout: Optional[int] = 1500) -> None:
+        """Run several actions back-to-back and wait once for the page to settle.
+        
+        Each action is a dict whose "type" names one of the CHAINABLE_ACTIONS and
+        whose remaining keys are that method's arguments, e.g.
+        {"type": "keypress", "keys": ["Control", "a"]}. No sleeps are inserted
+        between steps; selector-based steps rely on Playwright's auto-wait.
+        
+        Args:
+            actions: Actions to perform, in order
+            settle_timeout: Maximum time in milliseconds to wait for network idle
+                after the last action, None to skip the wait
+        """
+        for action in actions:
+            params = dict(action)
+            action_type = params.pop("type")
+            if action_type not in CHAINABLE_ACTIONS:
+                raise ValueError(f"Unsupported chain action: {action_type}")
+            getattr(self, action_type)(**params)
+            
+        if settle_timeout is not None:
+            # Pages with long-polling connections may never go idle, so a timeout is fine
+            self.wait_for_load_state("networkidle", timeout=settle_timeout)
+
     def keypress(self, keys: List[str]) -> None:
         mapped_keys = [CUA_KEY_TO_PLAYWRIGHT_KEY.get(key.lower(), key) for key in keys]
+        if is_single_press(mapped_keys):
+            # One driver call instead of a down/up pair per key
+            self._page.keyboard.press("+".join(mapped_keys))
+            return
         for key in mapped_keys:
             self._page.keyboard.down(key)
         for key in reversed(mapped_keys):
@@ -225,15 +461,18 @@ class BasePlaywrightBrowser(Browser):
 
     # --- Extra browser-oriented actions ---
     def goto(self, url: str) -> None:
+        self._invalidate_screenshot()
         try:
             return self._page.goto(url)
         except Exception as e:
             print(f"Error navigating to {url}: {e}")
 
     def back(self) -> None:
+        self._invalidate_screenshot()
         return self._page.go_back()
 
     def forward(self) -> None:
+        self._invalidate_screenshot()
         return self._page.go_forward()
         
     def get_page_html(self) -> str:
@@ -245,26 +484,12 @@ class BasePlaywrightBrowser(Browser):
         
         Returns a dictionary with element properties like tag, text, attributes, etc.
         """
-        return self._page.evaluate("""
-            selector => {
-                const el = document.querySelector(selector);
-                if (!el) return null;
-                
-                const attributes = {};
-                for (const attr of el.attributes) {
-                    attributes[attr.name] = attr.value;
-                }
-                
-                return {
-                    tag: el.tagName.toLowerCase(),
-                    text: el.innerText,
-                    html: el.innerHTML,
-                    attributes: attributes,
-                    isVisible: el.offsetWidth > 0 && el.offsetHeight > 0,
-                    boundingBox: el.getBoundingClientRect().toJSON()
-                };
-            }
-        """, selector)
+        try:
+            return self._page.evaluate("selector => window.__agent.info(selector)", selector)
+        except Exception:
+            # Document was loaded before the init script was registered; install it now
+            self._page.evaluate(AGENT_HELPERS_SCRIPT)
+            return self._page.evaluate("selector => window.__agent.info(selector)", selector)
     
     def fill_form(self, selector: str, value: str) -> None:
         """Fill a form field with the given value."""
@@ -290,7 +515,11 @@ class BasePlaywrightBrowser(Browser):
         else:
             raise IndexError(f"Tab index {tab_index} out of range (0-{len(pages)-1})")
 
-    # --- Subclass hook ---
+    # --- Subclass hooks ---
     def _get_browser_and_page(self) -> tuple[PlaywrightBrowser, Page]:
         """Subclasses must implement, returning (PlaywrightBrowser, Page)."""
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def _new_context(self, **context_options) -> BrowserContext:
+        """Create a BrowserContext on the running browser; subclasses may add defaults."""
+        return self._browser.new_context(**context_options)
\ No newline at end of file
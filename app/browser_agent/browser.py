@@ -1,4 +1,4 @@
-from typing import Protocol, List, Literal, Dict, Optional
+from typing import Any, Protocol, List, Literal, Dict, Optional
 
 
 class Browser(Protocol):
@@ -7,7 +7,9 @@ class Browser(Protocol):
     @property
     def dimensions(self) -> tuple[int, int]: ...
 
-    def screenshot(self) -> str: ...
+    def screenshot_bytes(self, fast: bool = True) -> bytes: ...
+
+    def screenshot(self, skip_unchanged: bool = False, fast: bool = True) -> str: ...
 
     def click(self, x: int, y: int, button: str = "left") -> None: ...
     
@@ -23,8 +25,14 @@ class Browser(Protocol):
     
     def wait_for_selector(self, selector: str, timeout: Optional[int] = None) -> bool: ...
 
+    def wait_for_load_state(self, state: str = "networkidle", timeout: Optional[int] = None) -> bool: ...
+
+    def wait_for(self, selector_or_state: str, timeout: Optional[int] = None) -> bool: ...
+
     def move(self, x: int, y: int) -> None: ...
 
+    def chain(self, actions: List[Dict[str, Any]], settle_timeout: Optional[int] = 1500) -> None: ...
+
     def keypress(self, keys: List[str]) -> None: ...
 
     def drag(self, path: List[Dict[str, int]]) -> None: ...
@@ -0,0 +1,29 @@
+"""Helpers shared by the sync and async Playwright browsers."""
+
+from typing import List
+
+# pybase64 uses SIMD codecs where available; the stdlib API is identical
+try:
+    import pybase64 as b64
+except ImportError:
+    import base64 as b64
+
+MODIFIER_KEYS = frozenset({"Alt", "Control", "Meta", "Shift"})
+
+
+def is_single_press(keys: List[str]) -> bool:
+    """True if `keyboard.press` can send the keys in one call.
+    
+    That covers a single key, e.g. ["Enter"], and modifiers plus one final key,
+    e.g. ["Control", "a"] sent as "Control+a".
+    """
+    if len(keys) == 1:
+        return bool(keys[0])
+    *modifiers, final_key = keys or [""]
+    return (
+        bool(modifiers)
+        and all(key in MODIFIER_KEYS for key in modifiers)
+        and final_key not in MODIFIER_KEYS
+        # "+" is the separator in Playwright's shortcut syntax
+        and final_key not in ("", "+")
+    )
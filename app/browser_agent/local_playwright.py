@@ -1,23 +1,52 @@
 from pathlib import Path
 import os
-from playwright.sync_api import Browser as PlaywrightBrowser, Page
+import shutil
+from playwright.sync_api import Browser as PlaywrightBrowser, BrowserContext, Page
+from typing import Optional
+from app.memory.selector_memory import SelectorMemory
 from .base_playwright_browser import BasePlaywrightBrowser
 
+# Chromium flags for automation boxes: no /dev/shm size limit, no GPU process, and no
+# throttling of timers or rendering when the window is in the background or covered
+PERFORMANCE_ARGS = [
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+]
+# Default flags Playwright adds that automation runs don't need
+IGNORED_DEFAULT_ARGS = ["--enable-automation"]
+
 
 class LocalPlaywrightBrowser(BasePlaywrightBrowser):
     """Launches a local Chromium instance using Playwright."""
 
-    def __init__(self, headless: bool = False):
-        super().__init__()
+    def __init__(self, headless: bool = False, selector_memory: Optional[SelectorMemory] = None,
+                 save_downloads: bool = True, start_url: Optional[str] = None):
+        """
+        Args:
+            headless: Whether to run the browser without a window
+            selector_memory: Optional memory used to cache resolved selectors
+            save_downloads: Move every finished download into ./downloads; disable
+                when the caller handles downloads itself via `expect_download()`
+            start_url: Page to open at launch; None leaves the tab on about:blank
+                so callers that navigate right away don't pay for an extra page load
+        """
+        super().__init__(selector_memory=selector_memory)
         self.headless = headless
+        self.save_downloads = save_downloads
+        self.start_url = start_url
 
     def _get_browser_and_page(self) -> tuple[PlaywrightBrowser, Page]:
         width, height = self.dimensions
-        launch_args = [f"--window-size={width},{height}", "--disable-extensions", "--disable-file-system"]
+        launch_args = [f"--window-size={width},{height}", "--disable-extensions", "--disable-file-system",
+                       *PERFORMANCE_ARGS]
         browser = self._playwright.chromium.launch(
             chromium_sandbox=True,
             headless=self.headless,
             args=launch_args,
+            ignore_default_args=IGNORED_DEFAULT_ARGS,
             env={"DISPLAY": ":0"}
         )
 
@@ -25,26 +54,31 @@ class LocalPlaywrightBrowser(BasePlaywrightBrowser):
         downloads_path = Path("./downloads").absolute()
         downloads_path.mkdir(exist_ok=True)
         
-        # Configure browser context with download options
-        context = browser.new_context(
-            accept_downloads=True
-        )
-        
         print(f"Downloads path: {downloads_path}")
 
+        self._browser = browser
+        context = self._new_context()
+        page = context.new_page()
+        if self.start_url:
+            page.goto(self.start_url)
+
+        return browser, page
+        
+    def _new_context(self, **context_options) -> BrowserContext:
+        """Create a download-enabled context sized to `dimensions` with page/download handlers."""
+        width, height = self.dimensions
+        context_options.setdefault("accept_downloads", True)
+        context_options.setdefault("viewport", {"width": width, "height": height})
+        context = self._browser.new_context(**context_options)
+
         # Add event listeners for page creation and closure
         context.on("page", self._handle_new_page)
         
         # Handle download events
-        context.on("download", self._handle_download)
-
-        page = context.new_page()
-        page.set_viewport_size({"width": width, "height": height})
-        page.on("close", self._handle_page_close)
+        if self.save_downloads:
+            context.on("download", self._handle_download)
 
-        page.goto("https://bing.com")
-
-        return browser, page
+        return context
         
     def _handle_download(self, download):
         """Handle download events."""
@@ -53,15 +87,16 @@ class LocalPlaywrightBrowser(BasePlaywrightBrowser):
             downloads_dir = Path("./downloads").absolute()
             save_path = downloads_dir / download.suggested_filename
             
-            # Use Playwright's built-in save_as method
-            download.save_as(save_path)
-            
-            print(f"Download saved to: {save_path}")
-            
-            # Wait for download to complete
-            path_info = download.path()
-            if path_info:
-                print(f"Download saved at: {path_info}")
+            # path() waits for the download to complete; move Playwright's temp file
+            # into place rather than copying it with save_as()
+            src = download.path()
+            if src:
+                try:
+                    os.replace(src, save_path)
+                except OSError:
+                    # Temp dir is on a different filesystem
+                    shutil.move(src, save_path)
+                print(f"Download saved to: {save_path}")
         except Exception as e:
             print(f"Error handling download: {e}")
 
@@ -70,6 +105,8 @@ class LocalPlaywrightBrowser(BasePlaywrightBrowser):
         print("New page created")
         self._page = page
         page.on("close", self._handle_page_close)
+        # Navigation tracking is installed by _setup_page(); here only the active page changed
+        self._invalidate_screenshot()
 
     def _handle_page_close(self, page: Page):
         """Handle the closure of a page."""
@@ -9,8 +9,30 @@ import json
 import os
 import time
 import logging
+import weakref
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2).encode("utf-8")
+
+    _loads = json.loads
+
+
+def _flush_if_alive(ref: "weakref.ref[SelectorMemory]") -> None:
+    """Exit-time flush for a SelectorMemory that may already have been collected."""
+    memory = ref()
+    if memory is not None:
+        memory.flush()
+
 
 class SelectorMemory:
     """Memory system for storing UI element selectors used by browser agents.
@@ -25,37 +47,110 @@ class SelectorMemory:
         
         # After successful interaction
         memory.update_selector("login_page", "login_button", ".login-btn", success=True)
+        
+    Changes are kept in memory and written back to disk in batches: once
+    `flush_every` updates are pending or `flush_interval` seconds have passed
+    since the last write, on `flush()` or `close()`, when used as a context
+    manager, and at interpreter exit.
     """
     
-    def __init__(self, agent_name: str, cache_dir: str = "./cache"):
+    def __init__(self, agent_name: str, cache_dir: str = "./cache",
+                 flush_interval: float = 2.0, flush_every: int = 32):
         """Initialize a new selector memory for a specific agent.
         
         Args:
             agent_name: Unique name of the agent (e.g., "metabase", "hubspot")
             cache_dir: Base directory for storing memory files
+            flush_interval: Seconds after the last write at which the next change is written
+            flush_every: Number of pending changes that triggers a write regardless of time
         """
         self.agent_name = agent_name
         self.cache_dir = Path(cache_dir) / agent_name
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.memory_file = self.cache_dir / "selector_memory.json"
-        self.memory = self._load_memory()
         self.logger = logging.getLogger(f"SelectorMemory.{agent_name}")
+        self.memory = self._load_memory()
+        self._build_index()
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self._dirty = False
+        # Changes made since the last write
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        # Flush at interpreter exit; holds only a weak reference, so the instance can still be collected
+        self._finalizer = weakref.finalize(self, _flush_if_alive, weakref.ref(self))
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        
+    def close(self) -> None:
+        """Write pending changes and cancel the exit-time flush."""
+        self.flush()
+        self._finalizer.detach()
         
     def _load_memory(self) -> Dict[str, Any]:
         """Load memory from disk or create empty memory if file doesn't exist."""
         if self.memory_file.exists():
             try:
-                with open(self.memory_file, "r") as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
+                return _loads(self.memory_file.read_bytes())
+            except ValueError:
+                # Both json.JSONDecodeError and orjson.JSONDecodeError subclass ValueError
                 self.logger.warning(f"Memory file corrupted, creating new memory")
                 return {}
         return {}
         
+    def _build_index(self) -> None:
+        """Index entries by (page, element_name) and reset pending access times.
+        
+        Index values are the same dicts stored in `self.memory`, so in-place
+        updates to an entry are visible through both.
+        """
+        self._flat: Dict[Tuple[str, str], Dict[str, Any]] = {
+            (page, name): entry
+            for page, entries in self.memory.items()
+            for name, entry in entries.items()
+        }
+        self._accessed: Dict[Tuple[str, str], float] = {}
+        
+    def _reconcile_access_times(self) -> None:
+        """Copy access times recorded by get_selector into the stored entries."""
+        for key, accessed_at in self._accessed.items():
+            entry = self._flat.get(key)
+            if entry is not None:
+                entry["last_accessed"] = accessed_at
+                self._dirty = True
+        self._accessed.clear()
+        
     def save(self) -> None:
-        """Save current memory state to disk."""
-        with open(self.memory_file, "w") as f:
-            json.dump(self.memory, f, indent=2)
+        """Save current memory state to disk.
+        
+        Pending access times are folded in first. Writes to a temporary file
+        and renames it over the memory file so a crash mid-write never leaves
+        a truncated JSON file behind.
+        """
+        self._reconcile_access_times()
+        tmp_file = self.memory_file.with_suffix(".json.tmp")
+        tmp_file.write_bytes(_dumps(self.memory))
+        os.replace(tmp_file, self.memory_file)
+        self._dirty = False
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        
+    def flush(self) -> None:
+        """Write pending changes to disk, if there are any."""
+        if self._dirty or self._accessed:
+            self.save()
+            
+    def _mark_dirty(self) -> None:
+        """Record a pending change and write the batch back once it's big or old enough."""
+        self._dirty = True
+        self._pending += 1
+        if (self._pending >= self.flush_every
+                or time.monotonic() - self._last_flush > self.flush_interval):
+            self.save()
             
     def get_selector(self, page: str, element_name: str) -> Optional[str]:
         """Retrieve a selector for a specific UI element.
@@ -67,12 +162,13 @@ class SelectorMemory:
         Returns:
             The selector string if found, None otherwise
         """
-        if page in self.memory and element_name in self.memory[page]:
-            # Update last accessed time
-            self.memory[page][element_name]["last_accessed"] = time.time()
-            self.save()
-            return self.memory[page][element_name]["selector"]
-        return None
+        key = (page, element_name)
+        entry = self._flat.get(key)
+        if entry is None:
+            return None
+        # Access time is copied into the entry on the next flush
+        self._accessed[key] = time.time()
+        return entry["selector"]
         
     def update_selector(self, page: str, element_name: str, selector: str, success: bool = True) -> None:
         """Store or update a selector with success information.
@@ -85,6 +181,8 @@ class SelectorMemory:
         """
         if page not in self.memory:
             self.memory[page] = {}
+        # This update refreshes last_accessed itself
+        self._accessed.pop((page, element_name), None)
             
         # If entry exists, update confidence score
         if element_name in self.memory[page]:
@@ -110,8 +208,9 @@ class SelectorMemory:
                 "last_accessed": time.time(),
                 "uses": 1
             }
+            self._flat[(page, element_name)] = self.memory[page][element_name]
             
-        self.save()
+        self._mark_dirty()
     
     def get_selectors_for_page(self, page: str) -> Dict[str, str]:
         """Get all remembered selectors for a specific page.
@@ -133,11 +232,14 @@ class SelectorMemory:
         """Remove a selector from memory."""
         if page in self.memory and element_name in self.memory[page]:
             del self.memory[page][element_name]
+            self._flat.pop((page, element_name), None)
+            self._accessed.pop((page, element_name), None)
             self.save()
             
     def clear_memory(self) -> None:
         """Reset memory completely."""
         self.memory = {}
+        self._build_index()
         self.save()
         self.logger.info(f"Memory cleared for agent {self.agent_name}")
         
@@ -150,22 +252,21 @@ class SelectorMemory:
         Returns:
             Number of selectors removed
         """
-        count = 0
-        now = time.time()
-        max_age_seconds = max_age_days * 24 * 60 * 60
-        
-        for page in list(self.memory.keys()):
-            for element in list(self.memory[page].keys()):
-                last_access = self.memory[page][element].get("last_accessed", 0)
-                if now - last_access > max_age_seconds:
-                    del self.memory[page][element]
-                    count += 1
-                    
-            # Clean up empty pages
-            if not self.memory[page]:
-                del self.memory[page]
+        self._reconcile_access_times()
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        
+        # Rebuild in one pass instead of deleting inside the loops; empty pages are dropped
+        kept = {
+            page: {element: data for element, data in entries.items()
+                   if data.get("last_accessed", 0) >= cutoff}
+            for page, entries in self.memory.items()
+        }
+        kept = {page: entries for page, entries in kept.items() if entries}
+        count = len(self._flat) - sum(len(entries) for entries in kept.values())
+        self.memory = kept
                 
         if count > 0:
+            self._build_index()
             self.save()
             self.logger.info(f"Cleaned {count} old selectors")
             
@@ -1,3 +1,4 @@
 from .metabase import MetabaseAgent
+from .metabase_async import MetabaseAgentAsync
 
-__all__ = ["MetabaseAgent"]
\ No newline at end of file
+__all__ = ["MetabaseAgent", "MetabaseAgentAsync"]
\ No newline at end of file
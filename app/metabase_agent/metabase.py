@@ -1,51 +1,117 @@
 import os
+import re
 import time
 import logging
-from typing import Optional, Dict, Any
+import weakref
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, List, Tuple
 from pathlib import Path
 from dotenv import load_dotenv
+from playwright.sync_api import Error as PlaywrightError, Locator, Page
 from app.browser_agent.local_playwright import LocalPlaywrightBrowser
 from app.memory.selector_memory import SelectorMemory
 
 load_dotenv(override=True)
 logger = logging.getLogger(__name__)
 
+# Requests a headless SQL workflow never needs. Both patterns are matched inside the
+# Playwright driver, so allowed requests never call back into Python.
+HEAVY_RESOURCE_RE = re.compile(
+    r"^[^?#]*\.(?:png|jpe?g|gif|webp|ico|woff2?|ttf|otf|eot|mp4|webm|mp3)(?:[?#]|$)",
+    re.IGNORECASE,
+)
+ANALYTICS_RE = re.compile(
+    r"^[a-z]+://(?:[^/?#]*\.)?(?:google-analytics|googletagmanager|segment|hotjar|intercom|intercomcdn|fullstory)"
+    r"\.(?:com|io)(?:[:/?#]|$)",
+    re.IGNORECASE,
+)
+
+# Replaces the whole SQL editor contents through ACE's own API and focuses it.
+# Returns false when the element has no ACE editor attached.
+ACE_SET_VALUE_SCRIPT = """(el, sql) => {
+    const editor = el.env && el.env.editor;
+    if (!editor) return false;
+    editor.setValue(sql, 1);
+    editor.focus();
+    return true;
+}"""
+
+
+@dataclass(frozen=True)
+class MetabaseLocators:
+    """Playwright locators for the fixed Metabase UI elements the agent drives.
+    
+    Locators are lazy and re-resolve against the DOM on every action, so one
+    set stays valid for the lifetime of a page.
+    """
+    new_button: Locator
+    sql_query_link: Locator
+    database_picker: Locator
+    database_search: Locator
+    sql_editor: Locator
+    query_builder: Locator
+    query_results: Locator
+    download_button: Locator
+    csv_option: Locator
+
+
+def _close_if_alive(ref: "weakref.ref[MetabaseAgent]") -> None:
+    """Exit-time close for a MetabaseAgent that may already have been collected."""
+    agent = ref()
+    if agent is not None:
+        agent.close()
+
+
 class MetabaseAgent:
-    """Agent for interacting with Metabase to run SQL queries and download results."""
+    """Agent for interacting with Metabase to run SQL queries and download results.
+    
+    Entering the agent launches the browser and logs in once; every query then
+    reuses that logged-in page.
+    
+    Example:
+        with MetabaseAgent(headless=True) as agent:
+            for query in queries:
+                agent.run_query_and_download(query)
+    """
     
     # Default selectors for common elements - verified with Playwright recordings
     DEFAULT_SELECTORS = {
         "login_page": {
             "username_field": "input[name='username'], input[type='email'], input[placeholder='Email address']",
             "password_field": "input[name='password'], input[type='password'], input[placeholder='Password']", 
-            "login_button": "button[type='submit'], button:contains('Sign in')"
+            "login_button": "button[type='submit'], button:has-text('Sign in')"
         },
         "nav": {
-            "new_button": "button:contains('New'), button[name='New'], .Icon-add",
-            "question_option": "a:contains('Question'), .List-item:contains('Question')"
+            "new_button": "button:has-text('New'), button[name='New'], .Icon-add",
+            "question_option": "a:has-text('Question'), .List-item:has-text('Question')"
         },
         "new_question_menu": {
             "sql_option": "a[role='link'][name='sql icon SQL query']"
         },
         "question_page": {
             "database_selector": "[data-testid='gui-builder-data'] a, .List-section-header, .QueryBuilder-section button",
-            "database_search": "[data-testid='list-search-field'], input[type='search'], input:placeholder('Find a database')",
-            "database_option": "heading:contains('primary_facade'), div:contains('primary_facade')",
+            "database_search": "[data-testid='list-search-field'], input[type='search']",
+            "database_option": "heading:has-text('primary_facade'), div:has-text('primary_facade')",
             "sql_editor": ".ace_content, .ace_editor", 
-            "run_button": "[data-testid='run-button'], button:contains('Run')"
+            "run_button": "[data-testid='run-button'], button:has-text('Run')"
         },
         "results_page": {
-            "download_button": "[data-testid='download-button'], button:contains('Download')",
-            "csv_option": "[data-testid='download-results-button'], a:contains('CSV'), div:contains('CSV')"
+            "download_button": "[data-testid='download-button'], button:has-text('Download')",
+            "csv_option": "[data-testid='download-results-button'], a:has-text('CSV'), div:has-text('CSV')"
         }
     }
     
+    # Saved login sessions older than this are ignored (seconds)
+    STORAGE_STATE_TTL = 12 * 60 * 60
+    
     def __init__(self, 
                 headless: bool = False, 
                 metabase_url: str = "https://metabase.startengine.com",
                 username: Optional[str] = None,
                 password: Optional[str] = None,
-                cache_dir: str = "./cache"):
+                cache_dir: str = "./cache",
+                block_resources: bool = True):
         """Initialize the Metabase agent.
         
         Args:
@@ -54,8 +120,10 @@ class MetabaseAgent:
             username: Metabase username (if None, reads from METABASE_USERNAME env var)
             password: Metabase password (if None, reads from METABASE_PASSWORD env var)
             cache_dir: Directory for caching memory
+            block_resources: Abort image, font and media downloads and analytics scripts
         """
         self.headless = headless
+        self.block_resources = block_resources
         self.metabase_url = metabase_url
         self.username = username or os.getenv("METABASE_USERNAME")
         self.password = password or os.getenv("METABASE_PASSWORD")
@@ -65,6 +133,127 @@ class MetabaseAgent:
             
         # Initialize selector memory
         self.memory = SelectorMemory("metabase", cache_dir)
+        # The browser's own per-URL locator cache, kept apart from the logical page.element entries
+        self.browser_memory = SelectorMemory("metabase_browser", cache_dir)
+        
+        # Cookies and local storage of the last logged-in session
+        self.storage_state_path = self.memory.cache_dir / "storage_state.json"
+        
+        # Long-lived browser shared by all runs, launched on first use
+        self._browser: Optional[LocalPlaywrightBrowser] = None
+        # Logged-in page reused by all runs; closing it closes its BrowserContext
+        self._session: Optional[ExitStack] = None
+        # Locators for the session page
+        self._loc: Optional[MetabaseLocators] = None
+        # Agents used without a with-block still get their browser shut down at exit;
+        # the finalizer holds only a weak reference, so it doesn't keep the agent alive
+        weakref.finalize(self, _close_if_alive, weakref.ref(self))
+        
+    def __enter__(self):
+        # Launch the browser and log in once, up front
+        self._get_session()
+        return self
+        
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        
+    def _get_browser(self) -> LocalPlaywrightBrowser:
+        """Return the shared browser, launching Chromium if it isn't running yet."""
+        if self._browser is None:
+            self._browser = LocalPlaywrightBrowser(
+                headless=self.headless,
+                selector_memory=self.browser_memory,
+                # _download_results saves files itself via expect_download()
+                save_downloads=False,
+            ).__enter__()
+        return self._browser
+        
+    def _get_session(self) -> LocalPlaywrightBrowser:
+        """Return the shared browser with its logged-in session page open.
+        
+        On first use this opens a BrowserContext (from the saved session, if
+        any), navigates to Metabase and logs in; later calls return right away.
+        """
+        browser = self._get_browser()
+        if self._session is not None:
+            return browser
+        
+        # Start from the saved session, if any, so _handle_login finds us logged in
+        context_options = {}
+        storage_state = self._saved_storage_state()
+        if storage_state:
+            context_options["storage_state"] = storage_state
+        
+        session = ExitStack()
+        page = session.enter_context(browser.new_context_page(**context_options))
+        self._session = session
+        self._loc = self._locators(page)
+        if self.block_resources:
+            self._block_resources(page)
+        
+        self._go_home(browser)
+        self._handle_login(browser)
+        return browser
+        
+    def _go_home(self, browser: LocalPlaywrightBrowser) -> None:
+        """Navigate the session page to the Metabase home page."""
+        browser.goto(self.metabase_url)
+        # Metabase keeps long-polling connections open, so wait for the DOM rather than network idle
+        browser.wait_for_load_state("domcontentloaded")
+        
+    def close(self) -> None:
+        """Close the session page, shut down the shared browser and persist selector memory."""
+        if self._session is not None:
+            session, self._session = self._session, None
+            self._loc = None
+            session.close()
+        if self._browser is not None:
+            browser, self._browser = self._browser, None
+            browser.__exit__(None, None, None)
+        self.memory.flush()
+        self.browser_memory.flush()
+        
+    def _saved_storage_state(self) -> Optional[str]:
+        """Path of the saved session if it's recent enough to reuse, None otherwise."""
+        try:
+            age = time.time() - self.storage_state_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        return str(self.storage_state_path) if age < self.STORAGE_STATE_TTL else None
+        
+    @staticmethod
+    def _block_resources(page: Page) -> None:
+        """Abort requests for static assets and analytics before the first navigation."""
+        page.route(HEAVY_RESOURCE_RE, lambda route: route.abort())
+        page.route(ANALYTICS_RE, lambda route: route.abort())
+        
+    @staticmethod
+    def _locators(page: Page) -> MetabaseLocators:
+        """Build the locators for the Metabase UI once per page."""
+        return MetabaseLocators(
+            new_button=page.get_by_role("button", name="New"),
+            sql_query_link=page.get_by_role("link", name="sql icon SQL query"),
+            database_picker=page.get_by_test_id("gui-builder-data").locator("a"),
+            database_search=page.get_by_test_id("list-search-field"),
+            sql_editor=page.locator(".ace_editor").first,
+            query_builder=page.get_by_test_id("query-builder-main"),
+            query_results=page.get_by_test_id("query-visualization-root"),
+            download_button=page.get_by_test_id("download-button"),
+            csv_option=page.get_by_test_id("download-results-button"),
+        )
+        
+    @staticmethod
+    def _wait_for(locator: Locator, timeout: int) -> bool:
+        """Wait for a cached locator to become visible.
+        
+        Returns:
+            True if it appeared, False if it timed out
+        """
+        try:
+            locator.wait_for(timeout=timeout)
+            return True
+        except PlaywrightError:
+            return False
         
     @staticmethod
     def create_recording(output_file: str, url: str = "https://metabase.startengine.com"):
@@ -111,14 +300,9 @@ class MetabaseAgent:
         if download_path is None:
             download_path = str(Path.cwd())
         
-        with LocalPlaywrightBrowser(headless=self.headless) as browser:
-            # Navigate to Metabase
-            browser.goto(self.metabase_url)
-            browser.wait(5000)  # Wait longer for page to load
-            
-            # Check if we need to log in
-            self._handle_login(browser)
-            
+        # Runs share one browser and one logged-in page; the first run launches and logs in
+        browser = self._get_session()
+        try:
             # Navigate to new query interface
             self._create_new_question(browser)
             
@@ -130,86 +314,149 @@ class MetabaseAgent:
             
             # Download results
             file_path = self._download_results(browser, download_path)
+        finally:
+            # Leave the page on the home page, ready for the next query
+            self._go_home(browser)
             
-            return file_path
-            
-    def _get_selector(self, page: str, element: str) -> str:
-        """Get a selector from memory or fall back to default.
+        # Persist selector stats gathered during this run
+        self.memory.flush()
+        
+        return file_path
+            
+    @classmethod
+    def _compile_defaults(cls) -> Dict[Tuple[str, str], List[str]]:
+        """Parse DEFAULT_SELECTORS once into lists of alternatives keyed by (page, element)."""
+        # Cached in the class's own __dict__, so a subclass with other defaults compiles its own
+        compiled = cls.__dict__.get("_compiled_selectors")
+        if compiled is None:
+            # Comma-separated alternatives are tried one by one
+            compiled = {
+                (page, element): [option.strip() for option in selector.split(",")]
+                for page, elements in cls.DEFAULT_SELECTORS.items()
+                for element, selector in elements.items()
+            }
+            cls._compiled_selectors = compiled
+        return compiled
+        
+    def _get_selector(self, page: str, element: str) -> List[str]:
+        """Get selectors for an element from memory or fall back to defaults.
         
         Args:
             page: The logical page name
             element: The name of the UI element
             
         Returns:
-            CSS selector string for the element
+            Selectors to try in order; empty if none are known
         """
-        # Try to get from memory first
+        defaults = self._compile_defaults().get((page, element), [])
+        
+        # Try the remembered selector first, then the parsed defaults
         selector = self.memory.get_selector(page, element)
+        if selector:
+            # Older memory files may hold a comma-joined list of alternatives
+            remembered = [option.strip() for option in selector.split(",")]
+            return list(dict.fromkeys(remembered + defaults))
         
-        # Fall back to default if needed
-        if not selector and page in self.DEFAULT_SELECTORS and element in self.DEFAULT_SELECTORS[page]:
-            # Get the default selector
-            selector = self.DEFAULT_SELECTORS[page][element]
-            
-            # Support Playwright selectors format
-            if selector.startswith("role="):
-                # Convert role=button[name='Sign in'] to a locator selector
-                logger.info(f"Using role-based selector: {selector}")
-            elif selector.startswith("data-testid="):
-                # Convert data-testid=download-button to [data-testid='download-button']
-                parts = selector.split("=", 1)
-                if len(parts) > 1:
-                    attr, value = parts
-                    if ">>" in value:
-                        # Handle nested selectors like data-testid=gui-builder-data >> a
-                        main_part, sub_part = value.split(">>", 1)
-                        selector = f"[{attr}='{main_part.strip()}'] {sub_part.strip()}"
-                    else:
-                        selector = f"[{attr}='{value}']"
-                    logger.info(f"Converted data-testid selector to: {selector}")
-            
-        # If still no selector, log a warning
-        if not selector:
+        if not defaults:
             logger.warning(f"No selector found for {page}.{element}")
+        return defaults
+        
+    def _find_selector(self, browser, page: str, element: str, timeout: int) -> Optional[str]:
+        """Wait for any of an element's selectors to match a visible element.
+        
+        The alternatives are combined with `Locator.or_()` rather than joined
+        with commas, since role= selectors can't be part of a CSS selector list.
+        Alternatives Playwright can't parse are skipped, so a stale remembered
+        selector can't make the whole wait fail.
+        
+        Returns:
+            The first selector that matched, or None if none appeared in time
+        """
+        selectors, locators = [], []
+        for selector in self._get_selector(page, element):
+            locator = browser.locator(selector)
+            try:
+                # count() doesn't wait, but raises on a selector Playwright can't parse
+                locator.count()
+            except PlaywrightError as e:
+                logger.warning(f"Skipping invalid selector for {page}.{element}: {selector} ({e})")
+                continue
+            selectors.append(selector)
+            locators.append(locator)
+        if not locators:
+            return None
+        combined = locators[0]
+        for locator in locators[1:]:
+            combined = combined.or_(locator)
+        if not self._wait_for(combined.first, timeout):
+            return None
+        for selector, locator in zip(selectors, locators):
+            if locator.first.is_visible():
+                return selector
+        return None
+        
+    def _robust_click(self, browser, page: str, element: str, primary: Callable[[], Any],
+                      primary_selector: Optional[str] = None,
+                      fallback: Optional[List[str]] = None) -> bool:
+        """Click an element with its recorded locator, falling back to selectors.
+        
+        Selectors are only looked up when `primary` raises a Playwright error.
+        
+        Args:
+            browser: Browser instance
+            page: Logical page name
+            element: Element name
+            primary: Clicks the element using the locator from the Playwright recording
+            primary_selector: Selector string equivalent to `primary`, remembered when it works
+            fallback: Selectors to try instead of the remembered and default ones
             
-        return selector
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            primary()
+        except PlaywrightError as e:
+            logger.warning(f"Direct click on {page}.{element} failed: {e}")
+            return self._try_click_selector(browser, page, element, fallback)
         
-    def _try_click_selector(self, browser, page: str, element: str) -> bool:
+        if primary_selector:
+            self.memory.update_selector(page, element, primary_selector, success=True)
+        logger.info(f"Clicked {page}.{element}")
+        return True
+        
+    def _try_click_selector(self, browser, page: str, element: str,
+                            selectors: Optional[List[str]] = None) -> bool:
         """Attempt to click an element using selector from memory or defaults.
         
-        Updates memory with success or failure.
+        Updates memory with success or failure, unless explicit selectors are given.
         
         Args:
             browser: Browser instance
             page: Logical page name
             element: Element name
+            selectors: Selectors to try instead of the remembered and default ones
             
         Returns:
             True if successful, False otherwise
         """
-        selector = self._get_selector(page, element)
-        if not selector:
+        remember = selectors is None
+        selector_options = self._get_selector(page, element) if remember else selectors
+        if not selector_options:
             return False
             
-        # For selectors with multiple options (comma-separated)
-        selector_options = [s.strip() for s in selector.split(',')]
         logger.info(f"Trying to click {page}.{element} with selectors: {selector_options}")
         
         for specific_selector in selector_options:
             try:
                 # First wait for the selector to appear
                 if browser.wait_for_selector(specific_selector, timeout=2000):
-                    # Debug information
-                    element_info = browser.get_element_info(specific_selector)
-                    if element_info:
-                        logger.info(f"Found element: {specific_selector}, visible: {element_info.get('isVisible', False)}")
-                    
                     # Try to click it
+                    # The next step's locator auto-waits for whatever this click opens
                     browser.click_selector(specific_selector)
-                    browser.wait(1000)  # Longer wait after click
                     
                     # Update memory with successful click
-                    self.memory.update_selector(page, element, specific_selector, success=True)
+                    if remember:
+                        self.memory.update_selector(page, element, specific_selector, success=True)
                     logger.info(f"Successfully clicked {page}.{element} with selector: {specific_selector}")
                     return True
             except Exception as e:
@@ -218,15 +465,16 @@ class MetabaseAgent:
         
         # If we get here, none of the selectors worked
         logger.warning(f"All selectors failed for {page}.{element}")
-        self.memory.update_selector(page, element, selector, success=False)
+        if remember:
+            # Lower the remembered selector's confidence without replacing it
+            self.memory.update_selector(page, element, selector_options[0], success=False)
         return False
     
     def _handle_login(self, browser):
         """Handle Metabase login if needed using Playwright selectors."""
         # Check if we're already logged in by looking for the New button
         try:
-            new_button = self._get_selector("nav", "new_button")
-            if browser.wait_for_selector(new_button, timeout=3000):
+            if self._find_selector(browser, "nav", "new_button", timeout=3000):
                 logger.info("Already logged in, skipping login")
                 return
         except Exception:
@@ -236,68 +484,64 @@ class MetabaseAgent:
         logger.info("Login form detected, attempting to log in")
         
         try:
-            # Step 1: Click and fill email field
-            username_selector = self._get_selector("login_page", "username_field")
+            username_selector = self._find_selector(browser, "login_page", "username_field", timeout=5000)
             if not username_selector:
-                logger.warning("No username field selector found")
-                return
-                
-            logger.info(f"Clicking username field: {username_selector}")
-            if not browser.wait_for_selector(username_selector, timeout=5000):
                 logger.warning("Username field not found")
                 return
-                
-            browser.click_selector(username_selector)
-            browser.wait(500)
-            browser.type(self.username)
-            logger.info("Entered username")
-            
-            # Step 2: Tab to password field or click it directly
-            browser.keypress(["Tab"])  # This matches the recording behavior
-            browser.wait(200)
-            
-            # If Tab didn't work, try clicking directly
-            password_selector = self._get_selector("login_page", "password_field")
-            if password_selector:
-                if browser.wait_for_selector(password_selector, timeout=2000):
-                    browser.click_selector(password_selector)
-                    browser.wait(200)
-            
-            # Step 3: Enter password
-            browser.type(self.password)
-            browser.wait(500)
-            logger.info("Entered password")
-            
-            # Step 4: Click login button
-            login_selector = self._get_selector("login_page", "login_button")
-            if not login_selector:
-                logger.warning("No login button selector found")
-                browser.keypress(["Enter"])
-                browser.wait(5000)
+            password_selector = self._find_selector(browser, "login_page", "password_field", timeout=3000)
+            if not password_selector:
+                logger.warning("Password field not found")
                 return
-                
-            logger.info(f"Clicking login button: {login_selector}")
-            if not browser.wait_for_selector(login_selector, timeout=3000):
+            
+            # fill() waits for each field and replaces its contents, so no clicks or sleeps are needed
+            actions = [
+                {"type": "fill_form", "selector": username_selector, "value": self.username},
+                {"type": "fill_form", "selector": password_selector, "value": self.password},
+            ]
+            
+            login_selector = self._find_selector(browser, "login_page", "login_button", timeout=3000)
+            if login_selector:
+                logger.info(f"Clicking login button: {login_selector}")
+                actions.append({"type": "click_selector", "selector": login_selector})
+            else:
                 logger.warning("Login button not found, trying Enter key")
-                browser.keypress(["Enter"])
-                browser.wait(5000)
-                return
-                
-            browser.click_selector(login_selector)
-            logger.info("Clicked login button")
+                actions.append({"type": "keypress", "keys": ["Enter"]})
+            
+            browser.chain(actions, settle_timeout=None)
+            logger.info("Submitted login form")
             
-            # Wait for login to complete
-            browser.wait(5000)
+            # Wait for Metabase to redirect away from the login page
+            if self._wait_for_login_redirect(browser):
+                # Remember the selectors that got us logged in
+                self.memory.update_selector("login_page", "username_field", username_selector, success=True)
+                self.memory.update_selector("login_page", "password_field", password_selector, success=True)
+                if login_selector:
+                    self.memory.update_selector("login_page", "login_button", login_selector, success=True)
+                # Save the session so later runs can skip logging in
+                browser.page.context.storage_state(path=str(self.storage_state_path))
             
         except Exception as e:
             logger.error(f"Login failed: {e}")
             # Try pressing Enter as a fallback
             try:
                 browser.keypress(["Enter"])
-                browser.wait(5000)
+                self._wait_for_login_redirect(browser)
             except Exception:
                 pass
     
+    def _wait_for_login_redirect(self, browser, timeout: int = 10000) -> bool:
+        """Wait until the browser has navigated away from the login page.
+        
+        Returns:
+            True if the redirect happened, False if it timed out
+        """
+        try:
+            browser.page.wait_for_url(lambda url: "/auth/login" not in url, timeout=timeout)
+            return True
+        except Exception:
+            logger.warning("Still on the login page after submitting credentials")
+            return False
+    
     def _create_new_question(self, browser):
         """Create a new SQL query using code from Playwright recording."""
         logger.info("Creating new SQL query")
@@ -309,48 +553,23 @@ class MetabaseAgent:
             if not current_url.endswith("/"):
                 logger.info("Navigating to home page.")
                 browser.goto(self.metabase_url)
-                browser.wait(5000)
             
             # Step 2: Wait for and click the New button (just like in recording)
-            try:
-                browser._page.get_by_role("button", name="New").click()
-                logger.info("Clicked New button using get_by_role")
-            except Exception as e:
-                logger.warning(f"Role-based New button not found: {e}")
-                # Fall back to regular selectors
-                selectors = ["button:contains('New')", ".Icon-add", "button[data-testid='new-button']"]
-                clicked = False
-                for selector in selectors:
-                    if browser.wait_for_selector(selector, timeout=3000):
-                        browser.click_selector(selector)
-                        clicked = True
-                        break
-                if not clicked:
-                    logger.error("Could not find New button")
-                    return False
-            
-            browser.wait(1000)
+            self._wait_for(self._loc.new_button, timeout=10000)
+            if not self._robust_click(browser, "nav", "new_button", self._loc.new_button.click,
+                                      "role=button[name='New']"):
+                logger.error("Could not find New button")
+                return False
             
             # Step 3: Click the SQL query option directly (just like in recording)
-            try:
-                browser._page.get_by_role("link", name="sql icon SQL query").click()
-                logger.info("Clicked SQL query option using get_by_role")
-            except Exception as e:
-                logger.warning(f"Role-based SQL query option not found: {e}")
-                # Fall back to regular selectors
-                selectors = ["a:contains('SQL query')", "a:contains('SQL')", "a[href*='/question#']"]
-                clicked = False
-                for selector in selectors:
-                    if browser.wait_for_selector(selector, timeout=3000):
-                        browser.click_selector(selector)
-                        clicked = True
-                        break
-                if not clicked:
-                    logger.error("Could not find SQL query option")
-                    return False
-            
-            # Wait for page to load
-            browser.wait(5000)
+            if not self._robust_click(browser, "nav", "sql_option", self._loc.sql_query_link.click,
+                                      "role=link[name='sql icon SQL query']"):
+                logger.error("Could not find SQL query option")
+                return False
+            
+            # Wait for the query builder to load
+            if not self._wait_for(self._loc.query_builder, timeout=10000):
+                logger.warning("Query builder did not finish loading")
             logger.info("SQL query option clicked successfully")
             
             return True
@@ -367,67 +586,40 @@ class MetabaseAgent:
             # Using direct translation from the Playwright recording
             
             # Step 1: Click the database selector dropdown
-            try:
-                browser._page.get_by_test_id("gui-builder-data").locator("a").click()
-                logger.info("Clicked database selector using get_by_test_id")
-            except Exception as e:
-                logger.warning(f"Database selector click failed: {e}")
-                # Fallback to traditional selectors
-                selectors = ["[data-testid='gui-builder-data'] a", ".List-section-header", ".QueryBuilder-section button"]
-                clicked = False
-                for selector in selectors:
-                    if browser.wait_for_selector(selector, timeout=3000):
-                        browser.click_selector(selector)
-                        clicked = True
-                        break
-                if not clicked:
-                    logger.error("Could not find database selector")
-                    return
-            
-            browser.wait(1000)
+            if not self._robust_click(browser, "question_page", "database_selector",
+                                      self._loc.database_picker.click,
+                                      "[data-testid='gui-builder-data'] a"):
+                logger.error("Could not find database selector")
+                return
             
             # Step 2: Search for the primary_facade database
             try:
-                browser._page.get_by_test_id("list-search-field").fill(database_name)
+                self._loc.database_search.fill(database_name)
                 logger.info("Entered database name in search field")
             except Exception as e:
                 logger.warning(f"Database search field error: {e}")
                 # Fallback
                 if browser.wait_for_selector("[data-testid='list-search-field']", timeout=3000):
                     browser.click_selector("[data-testid='list-search-field']")
-                    browser.wait(500)
                     browser.type(database_name)
                 else:
                     logger.error("Could not find database search field")
             
-            browser.wait(1000)
-            
             # Either press Enter or click on the option
             try:
                 browser.keypress(["Enter"])
-                browser.wait(1000)
             except Exception:
                 pass
                 
             # Step 3: Click on the database option
-            try:
-                browser._page.get_by_role("heading", name="primary_facade").click()
-                logger.info("Selected database using get_by_role")
-            except Exception as e:
-                logger.warning(f"Database option click failed: {e}")
-                # Fallback
-                selectors = [f"heading[name='{database_name}']", f"div:contains('{database_name}')"]
-                clicked = False
-                for selector in selectors:
-                    if browser.wait_for_selector(selector, timeout=3000):
-                        browser.click_selector(selector)
-                        clicked = True
-                        break
-                if not clicked:
-                    logger.error(f"Could not find option for database: {database_name}")
-                    return
+            # The option depends on the database, so its selectors aren't remembered
+            if not self._robust_click(browser, "question_page", "database_option",
+                                      browser.page.get_by_role("heading", name=database_name).click,
+                                      fallback=[f"role=heading[name='{database_name}']",
+                                                f"div:has-text('{database_name}')"]):
+                logger.error(f"Could not find option for database: {database_name}")
+                return
             
-            browser.wait(1000)
             logger.info(f"Successfully selected database: {database_name}")
             
         except Exception as e:
@@ -438,66 +630,36 @@ class MetabaseAgent:
         logger.info("Running SQL query")
         
         try:
-            # Using direct translation from the Playwright recording
-            
-            # Step 1: Click the SQL editor area
+            # Replace the editor contents in one call, then run the query (Ctrl+Enter)
             try:
-                browser._page.locator(".ace_content").click()
-                logger.info("Clicked SQL editor using direct locator")
+                # evaluate() waits for the editor element, and setValue needs no select/delete first
+                if not self._loc.sql_editor.evaluate(ACE_SET_VALUE_SCRIPT, sql_query):
+                    browser.chain([
+                        {"type": "click_selector", "selector": ".ace_content"},
+                        {"type": "keypress", "keys": ["Control", "a"]},
+                        {"type": "keypress", "keys": ["Delete"]},
+                        # Fill the editor's hidden textarea so ACE doesn't auto-close brackets and quotes
+                        {"type": "fill_form", "selector": ".ace_text-input", "value": sql_query},
+                    ], settle_timeout=None)
+                browser.keypress(["Control", "Enter"])
+                logger.info("Entered and ran SQL query")
             except Exception as e:
-                logger.warning(f"SQL editor click failed: {e}")
+                logger.warning(f"SQL editor chain failed: {e}")
                 # Fallback
-                selectors = [".ace_content", ".ace_editor"]
-                clicked = False
-                for selector in selectors:
-                    if browser.wait_for_selector(selector, timeout=3000):
-                        browser.click_selector(selector)
-                        clicked = True
-                        break
-                if not clicked:
+                if not self._try_click_selector(browser, "question_page", "sql_editor"):
                     logger.error("Could not find SQL editor")
                     return
-            
-            browser.wait(500)
-            
-            # Step 2: Enter the SQL query
-            try:
-                # Clear existing content first
-                browser.keypress(["Control", "a"])
-                browser.wait(200)
-                browser.keypress(["Delete"])
-                browser.wait(200)
                 
-                # Type the query with extra newlines at the end like in the recording
-                browser._page.get_by_role("textbox").fill(sql_query + "\n\n")
-                logger.info("Entered SQL query using get_by_role")
-            except Exception as e:
-                logger.warning(f"SQL query input failed: {e}")
-                # Fallback
                 browser.type(sql_query + "\n\n")
-            
-            browser.wait(1000)
-            
-            # Step 3: Click the Run button
-            try:
-                browser._page.get_by_test_id("native-query-editor-sidebar").get_by_test_id("run-button").click()
-                logger.info("Clicked Run button using get_by_test_id")
-            except Exception as e:
-                logger.warning(f"Run button click failed: {e}")
-                # Fallback
-                selectors = ["[data-testid='run-button']", "button:contains('Run')"]
-                clicked = False
-                for selector in selectors:
-                    if browser.wait_for_selector(selector, timeout=3000):
-                        browser.click_selector(selector)
-                        clicked = True
-                        break
-                if not clicked:
+                
+                if not self._try_click_selector(browser, "question_page", "run_button"):
                     logger.error("Could not find Run button")
                     return
             
-            # Wait for query execution
-            browser.wait(8000)
+            # Wait for query execution to render results
+            if not self._wait_for(self._loc.query_results, timeout=60000):
+                logger.warning("Query results did not appear")
+                return
             logger.info("Query executed successfully")
             
         except Exception as e:
@@ -511,80 +673,35 @@ class MetabaseAgent:
             # Make sure download directory exists
             download_dir = Path(download_path)
             download_dir.mkdir(exist_ok=True)
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            
-            # Create a download listener with expected_file_path
-            expected_file_path = download_dir / f"metabase_query_result_{timestamp}.csv"
-            
-            # Create a flag for tracking if download has started
-            download_started = False
-            
-            # Set up download listener before clicking download button
-            with browser._page.expect_download() as download_info:
-                # Step 1: Click the download button
-                try:
-                    browser._page.get_by_test_id("download-button").click()
-                    logger.info("Clicked download button using get_by_test_id")
-                except Exception as e:
-                    logger.warning(f"Download button click failed: {e}")
-                    # Fallback
-                    selectors = ["[data-testid='download-button']", "button:contains('Download')"]
-                    clicked = False
-                    for selector in selectors:
-                        if browser.wait_for_selector(selector, timeout=5000):
-                            browser.click_selector(selector)
-                            clicked = True
-                            break
-                    if not clicked:
-                        logger.error("Could not find download button")
-                        return None
-                
-                browser.wait(1000)
-                
-                # Step 2: Click the download results (CSV) button
-                try:
-                    browser._page.get_by_test_id("download-results-button").click()
-                    logger.info("Clicked CSV option using get_by_test_id")
-                    download_started = True
-                except Exception as e:
-                    logger.warning(f"CSV option click failed: {e}")
-                    # Fallback
-                    selectors = ["[data-testid='download-results-button']", "a:contains('CSV')"]
-                    clicked = False
-                    for selector in selectors:
-                        if browser.wait_for_selector(selector, timeout=3000):
-                            browser.click_selector(selector)
-                            clicked = True
-                            download_started = True
-                            break
-                    if not clicked:
-                        logger.error("Could not find CSV option")
-                        return None
-            
-            # Get the download object if download started
-            if download_started:
-                try:
-                    download = download_info.value
-                    logger.info(f"Download started: {download.suggested_filename}")
-                    
-                    # Save the file to the specified path
-                    download.save_as(expected_file_path)
-                    logger.info(f"File saved to: {expected_file_path}")
-                    
-                    # Wait for download to complete
-                    download_path = download.path()
-                    if download_path:
-                        logger.info(f"Download completed at browser path: {download_path}")
-                    
-                    # Return the path where we saved the file
-                    return str(expected_file_path)
-                except Exception as e:
-                    logger.error(f"Error handling download: {e}")
-            else:
-                logger.error("Download was not initiated properly")
+            
+            # Step 1: Click the download button
+            if not self._robust_click(browser, "results_page", "download_button",
+                                      self._loc.download_button.click,
+                                      "[data-testid='download-button']"):
+                logger.error("Could not find download button")
+                return None
+            
+            # Step 2: Click the download results (CSV) button, listening only around that click
+            with browser.page.expect_download(timeout=60000) as download_info:
+                if not self._robust_click(browser, "results_page", "csv_option",
+                                          self._loc.csv_option.click,
+                                          "[data-testid='download-results-button']"):
+                    # Leaving the block normally would wait out the full download timeout
+                    raise LookupError("Could not find CSV option")
+            
+            download = download_info.value
+            logger.info(f"Download started: {download.suggested_filename}")
+            
+            # Keep Metabase's own file name; save_as() returns once the download has finished
+            file_name = download.suggested_filename or f"metabase_query_result_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+            file_path = download_dir / file_name
+            download.save_as(file_path)
+            logger.info(f"File saved to: {file_path}")
+            
+            return str(file_path)
             
         except Exception as e:
             logger.error(f"Error downloading results: {e}")
         
         # Return None if we couldn't download the file
-        return None
\ No newline at end of file
+        return None
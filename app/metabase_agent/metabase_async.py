@@ -0,0 +1,244 @@
+import os
+import time
+import asyncio
+import logging
+from typing import List, Optional, Set, Union
+from pathlib import Path
+from dotenv import load_dotenv
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+from app.browser_agent.async_local_playwright import AsyncLocalPlaywrightBrowser
+
+load_dotenv(override=True)
+logger = logging.getLogger(__name__)
+
+class MetabaseAgentAsync:
+    """Async agent for running Metabase SQL queries and downloading results.
+
+    Shares one Chromium process across queries and runs each query in its own
+    BrowserContext, so several queries can be awaited concurrently. Steps use
+    Playwright locators from the Metabase recording, which auto-wait for the
+    UI instead of sleeping; use `MetabaseAgent` for the synchronous API.
+
+    Example:
+        async with MetabaseAgentAsync(headless=True) as agent:
+            path = await agent.run_query_and_download("select 1")
+            paths = await agent.run_query_and_download_many(["select 1", "select 2"])
+    """
+    
+    # Saved login sessions older than this are ignored (seconds)
+    STORAGE_STATE_TTL = 12 * 60 * 60
+
+    def __init__(self,
+                headless: bool = False,
+                metabase_url: str = "https://metabase.startengine.com",
+                username: Optional[str] = None,
+                password: Optional[str] = None,
+                cache_dir: str = "./cache"):
+        """Initialize the async Metabase agent.
+
+        Args:
+            headless: Whether to run the browser in headless mode
+            metabase_url: URL of the Metabase instance
+            username: Metabase username (if None, reads from METABASE_USERNAME env var)
+            password: Metabase password (if None, reads from METABASE_PASSWORD env var)
+            cache_dir: Directory for the saved login session, shared with `MetabaseAgent`
+        """
+        self.headless = headless
+        self.metabase_url = metabase_url
+        self.username = username or os.getenv("METABASE_USERNAME")
+        self.password = password or os.getenv("METABASE_PASSWORD")
+
+        if not self.username or not self.password:
+            raise ValueError("Metabase credentials are required. Set them in .env file or pass them to the constructor.")
+
+        # Cookies and local storage of the last logged-in session
+        self.storage_state_path = Path(cache_dir) / "metabase" / "storage_state.json"
+        self.storage_state_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Browser shared by all queries, launched on first use
+        self._browser: Optional[AsyncLocalPlaywrightBrowser] = None
+        # Serializes logins so concurrent queries don't all submit the login form
+        self._login_lock = asyncio.Lock()
+        # Result files claimed by downloads that are still in progress
+        self._reserved_paths: Set[Path] = set()
+
+    async def __aenter__(self):
+        await self._get_browser()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _get_browser(self) -> AsyncLocalPlaywrightBrowser:
+        """Return the shared browser, launching Chromium if it isn't running yet."""
+        if self._browser is None:
+            self._browser = await AsyncLocalPlaywrightBrowser(headless=self.headless).__aenter__()
+        return self._browser
+
+    def _saved_storage_state(self) -> Optional[str]:
+        """Path of the saved session if it's recent enough to reuse, None otherwise."""
+        try:
+            age = time.time() - self.storage_state_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        return str(self.storage_state_path) if age < self.STORAGE_STATE_TTL else None
+
+    async def _ensure_logged_in(self) -> None:
+        """Log in once and save the session, unless a recent one is already saved."""
+        async with self._login_lock:
+            if self._saved_storage_state():
+                return
+            browser = await self._get_browser()
+            async with browser.new_context_page() as page:
+                await page.goto(self.metabase_url)
+                await self._handle_login(page)
+
+    async def close(self) -> None:
+        """Shut down the shared browser."""
+        if self._browser is not None:
+            browser, self._browser = self._browser, None
+            await browser.__aexit__(None, None, None)
+
+    async def run_query_and_download(self, sql_query: str, database: str = "primary_facade",
+                                     download_path: Optional[str] = None) -> str:
+        """Run a SQL query in Metabase and download the results.
+
+        Args:
+            sql_query: The SQL query to run
+            database: The database to query
+            download_path: Directory where to save the CSV (defaults to current dir)
+
+        Returns:
+            Path to the downloaded CSV file
+
+        Raises:
+            playwright.async_api.Error: If a step of the Metabase flow fails
+        """
+        if download_path is None:
+            download_path = str(Path.cwd())
+
+        browser = await self._get_browser()
+        storage_state = self._saved_storage_state()
+        context_options = {"storage_state": storage_state} if storage_state else {}
+        async with browser.new_context_page(**context_options) as page:
+            await page.goto(self.metabase_url)
+            await self._handle_login(page)
+            await self._create_new_question(page)
+            await self._select_database(page, database)
+            await self._run_query(page, sql_query)
+            return await self._download_results(page, download_path)
+
+    async def run_query_and_download_many(self, sql_queries: List[str], database: str = "primary_facade",
+                                          download_path: Optional[str] = None,
+                                          max_concurrency: int = 5) -> List[Union[str, BaseException]]:
+        """Run several SQL queries concurrently, each in its own BrowserContext.
+        
+        Logs in once up front, then starts every context from the saved session.
+        
+        Args:
+            sql_queries: The SQL queries to run
+            database: The database to query
+            download_path: Directory where to save the CSVs (defaults to current dir)
+            max_concurrency: Maximum number of queries running in Metabase at once
+            
+        Returns:
+            For each query, in order, the path to its CSV or the exception it raised
+        """
+        await self._ensure_logged_in()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_one(sql_query: str) -> str:
+            async with semaphore:
+                return await self.run_query_and_download(sql_query, database, download_path)
+        
+        return await asyncio.gather(*(run_one(q) for q in sql_queries), return_exceptions=True)
+
+    def run_query_and_download_sync(self, sql_query: str, database: str = "primary_facade",
+                                    download_path: Optional[str] = None) -> str:
+        """Blocking wrapper around `run_query_and_download` for callers without an event loop.
+
+        The browser is closed afterwards, since it is bound to the event loop
+        that `asyncio.run` creates and tears down.
+        """
+        async def run() -> str:
+            try:
+                return await self.run_query_and_download(sql_query, database, download_path)
+            finally:
+                await self.close()
+
+        return asyncio.run(run())
+
+    async def _handle_login(self, page: Page) -> None:
+        """Log in if the login form is shown."""
+        username_field = page.locator("input[name='username']")
+        # Whichever shows up first tells us if a login is needed, so a saved session doesn't wait out the timeout
+        new_button = page.get_by_role("button", name="New")
+        try:
+            await username_field.or_(new_button).first.wait_for(timeout=5000)
+        except PlaywrightTimeoutError:
+            logger.info("Neither login form nor New button appeared, assuming logged in")
+            return
+        if not await username_field.is_visible():
+            logger.info("Already logged in, skipping login")
+            return
+
+        await username_field.fill(self.username)
+        await page.locator("input[name='password']").fill(self.password)
+        await page.locator("button[type='submit']").click()
+        await page.wait_for_url(lambda url: "/auth/login" not in url, timeout=10000)
+        logger.info("Logged in")
+        # Save the session so other contexts and later runs can skip logging in
+        await page.context.storage_state(path=str(self.storage_state_path))
+
+    async def _create_new_question(self, page: Page) -> None:
+        """Open a new native SQL question."""
+        await page.get_by_role("button", name="New").click()
+        await page.get_by_role("link", name="sql icon SQL query").click()
+        logger.info("Opened new SQL query")
+
+    async def _select_database(self, page: Page, database_name: str) -> None:
+        """Select the database the query runs against."""
+        await page.get_by_test_id("gui-builder-data").locator("a").click()
+        await page.get_by_test_id("list-search-field").fill(database_name)
+        await page.get_by_role("heading", name=database_name).click()
+        logger.info(f"Selected database: {database_name}")
+
+    async def _run_query(self, page: Page, sql_query: str) -> None:
+        """Replace the editor contents with the query, run it and wait for results."""
+        await page.locator(".ace_content").click()
+        await page.keyboard.press("Control+a")
+        await page.keyboard.press("Delete")
+        # Fill the editor's hidden textarea so ACE doesn't auto-close brackets and quotes
+        await page.locator(".ace_text-input").fill(sql_query)
+        await page.keyboard.press("Control+Enter")
+        await page.wait_for_selector("[data-testid='query-visualization-root']", timeout=60000)
+        logger.info("Query executed successfully")
+
+    async def _download_results(self, page: Page, download_path: str) -> str:
+        """Download the query results as CSV and return the saved file path."""
+        async with page.expect_download(timeout=60000) as download_info:
+            await page.get_by_test_id("download-button").click()
+            await page.get_by_test_id("download-results-button").click()
+        download = await download_info.value
+        
+        # Keep Metabase's own file name, like MetabaseAgent does
+        file_name = download.suggested_filename or f"metabase_query_result_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+        file_path = self._reserve_file_path(Path(download_path), file_name)
+        try:
+            await download.save_as(file_path)
+        finally:
+            self._reserved_paths.discard(file_path)
+        logger.info(f"File saved to: {file_path}")
+
+        return str(file_path)
+
+    def _reserve_file_path(self, download_dir: Path, file_name: str) -> Path:
+        """Pick a path for file_name that neither an existing file nor a concurrent download uses."""
+        download_dir.mkdir(exist_ok=True)
+        file_path = download_dir / file_name
+        n = 1
+        while file_path in self._reserved_paths or file_path.exists():
+            file_path = download_dir / f"{Path(file_name).stem}_{n}{Path(file_name).suffix}"
+            n += 1
+        self._reserved_paths.add(file_path)
+        return file_path
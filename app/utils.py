@@ -1,15 +1,25 @@
 import os
+import re
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import json
 import base64
-from PIL import Image
-from io import BytesIO
 import io
 from urllib.parse import urlparse
-import threading
-import cv2
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# cv2, numpy and PIL are imported inside the image helpers that use them, so
+# importing this module for the API and URL helpers stays cheap
+
+try:
+    import orjson
+
+    def _dumps(obj, indent=False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+except ImportError:
+    def _dumps(obj, indent=False) -> bytes:
+        return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
 
 load_dotenv(override=True)
 
@@ -22,21 +32,57 @@ BLOCKED_DOMAINS = [
     "ilanbigio.com",
 ]
 
+# Matches a hostname that is a blocked domain or one of its subdomains
+_BLOCKED_HOST_RE = re.compile(
+    r"(?:^|\.)(?:" + "|".join(re.escape(domain) for domain in BLOCKED_DOMAINS) + r")\Z"
+)
+
+# Matches URLs whose host is a blocked domain or one of its subdomains, straight from
+# the raw URL string so per-request checks skip urlparse
+BLOCKED_URL_RE = re.compile(
+    r"^[a-z][a-z0-9+.-]*://(?:[^/?#@]*@)?(?:[^/?#:@]*\.)?(?:"
+    + "|".join(re.escape(domain) for domain in BLOCKED_DOMAINS)
+    + r")\.?(?::\d+)?(?:[/?#]|$)",
+    re.IGNORECASE,
+)
+
+# Shared session so repeated API calls reuse warm TCP/TLS connections. urllib3
+# already sets TCP_NODELAY on its sockets, so no socket options are needed.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=32))
+
+# (connect, read) timeouts in seconds for API calls
+API_TIMEOUT = (10, 120)
+
+# Credentials are read once, after load_dotenv above, rather than on every call
+_OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+_OPENAI_ORG = os.getenv("OPENAI_ORG")
+_AUTH_HEADERS = {
+    "Authorization": f"Bearer {_OPENAI_API_KEY}",
+    "Content-Type": "application/json",
+}
+if _OPENAI_ORG:
+    _AUTH_HEADERS["Openai-Organization"] = _OPENAI_ORG
+
 
 def pp(obj):
-    print(json.dumps(obj, indent=4))
+    print(_dumps(obj, indent=True).decode("utf-8"))
 
 
 def show_image_cv2(base_64_image, timeout=2):
-    """Display a base64-encoded PNG screenshot using OpenCV and close it after a timeout."""
+    """Display a base64-encoded screenshot using OpenCV and close it after a timeout."""
+    import cv2
+    import numpy as np
+
     # Decode base64 to raw image bytes
     image_data = base64.b64decode(base_64_image)
     np_arr = np.frombuffer(image_data, np.uint8)
 
-    # Decode the image from bytes into a numpy array (BGR format)
-    image = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    # Decode straight to half size (BGR format); the codec downscales while decoding
+    image = cv2.imdecode(np_arr, cv2.IMREAD_REDUCED_COLOR_2)
 
-    # Show image in an OpenCV window
+    # Show image in a resizable OpenCV window
+    cv2.namedWindow("Screenshot", cv2.WINDOW_NORMAL)
     cv2.imshow("Screenshot", image)
 
     # Wait for timeout (converted to milliseconds)
@@ -46,53 +92,59 @@ def show_image_cv2(base_64_image, timeout=2):
     cv2.destroyAllWindows()
 
 def show_image(base_64_image):
+    from PIL import Image
+
     image_data = base64.b64decode(base_64_image)
-    image = Image.open(BytesIO(image_data))
+    image = Image.open(io.BytesIO(image_data))
     image.show()
 
 
 def show_image_with_timeout(base_64_image, timeout=5):
     """Display an image and automatically close it after a set duration."""
-    image_data = base64.b64decode(base_64_image)
-    image = Image.open(BytesIO(image_data))
-    image.show()
+    # OpenCV closes its own window after waitKey, without a timer thread per image
+    show_image_cv2(base_64_image, timeout=timeout)
 
-    # Close the image after the timeout
-    def close_image():
-        image.close()
 
-    threading.Timer(timeout, close_image).start()
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
 
 
 def calculate_image_dimensions(base_64_image):
+    # A PNG's size sits in its IHDR chunk at bytes 16-24, which the first 32 base64 chars cover
+    header = base64.b64decode(base_64_image[:32])
+    if header[:8] == PNG_SIGNATURE:
+        return int.from_bytes(header[16:20], "big"), int.from_bytes(header[20:24], "big")
+    # Other formats (e.g. JPEG screenshots): Pillow only parses the header on open
+    from PIL import Image
+
     image_data = base64.b64decode(base_64_image)
     image = Image.open(io.BytesIO(image_data))
     return image.size
 
 
 def sanitize_message(msg: dict) -> dict:
-    """Return a copy of the message with image_url omitted for computer_call_output messages."""
+    """Return a copy of the message with image_url omitted for computer_call_output messages.
+
+    Messages with nothing to omit are returned as-is, without copying.
+    """
     if msg.get("type") == "computer_call_output":
-        output = msg.get("output", {})
-        if isinstance(output, dict):
-            sanitized = msg.copy()
-            sanitized["output"] = {**output, "image_url": "[omitted]"}
+        output = msg.get("output")
+        if isinstance(output, dict) and output.get("image_url", "[omitted]") != "[omitted]":
+            sanitized = dict(msg)
+            sanitized["output"] = dict(output)
+            sanitized["output"]["image_url"] = "[omitted]"
             return sanitized
     return msg
 
 
-def create_response(**kwargs):
-    url = "https://api.openai.com/v1/responses"
-    headers = {
-        "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
-        "Content-Type": "application/json"
-    }
+def sanitize_messages(msgs: list) -> list:
+    """Sanitize a whole conversation history; see sanitize_message."""
+    return [sanitize_message(msg) for msg in msgs]
 
-    openai_org = os.getenv("OPENAI_ORG")
-    if openai_org:
-        headers["Openai-Organization"] = openai_org
 
-    response = requests.post(url, headers=headers, json=kwargs)
+def create_response(**kwargs):
+    url = "https://api.openai.com/v1/responses"
+    # Serialize the body ourselves (Content-Type is already in the headers)
+    response = _SESSION.post(url, headers=_AUTH_HEADERS, data=_dumps(kwargs), timeout=API_TIMEOUT)
 
     if response.status_code != 200:
         print(f"Error: {response.status_code} {response.text}")
@@ -100,11 +152,19 @@ def create_response(**kwargs):
     return response.json()
 
 
+def create_response_batch(kwargs_list, max_workers=10):
+    """Call create_response for each kwargs dict concurrently, returning results in order.
+
+    Requests share the pooled session, so keep max_workers within its pool size
+    and within your OpenAI rate limits; rate-limited calls come back as error
+    responses like any other failed call.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda kwargs: create_response(**kwargs), kwargs_list))
+
+
 def check_blocklisted_url(url: str) -> None:
     """Raise ValueError if the given URL (including subdomains) is in the blocklist."""
-    hostname = urlparse(url).hostname or ""
-    if any(
-        hostname == blocked or hostname.endswith(f".{blocked}")
-        for blocked in BLOCKED_DOMAINS
-    ):
+    # One C-level regex search, however long the blocklist grows
+    if _BLOCKED_HOST_RE.search(urlparse(url).hostname or ""):
         raise ValueError(f"Blocked URL: {url}")
\ No newline at end of file
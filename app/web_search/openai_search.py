@@ -1,28 +1,288 @@
 import os
 import json
+import asyncio
 import re
-from typing import List, Dict, Optional, Any
-from openai import OpenAI
+import time
+import hashlib
+import functools
+from urllib.parse import urlparse
+from typing import TYPE_CHECKING, List, Dict, Optional, Any, Tuple
 from app.utils import check_blocklisted_url
 
+# openai (with httpx and pydantic) and numpy are imported where they're first
+# used, so importing this module stays cheap
+if TYPE_CHECKING:
+    import numpy as np
+    from openai import AsyncOpenAI, OpenAI
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Default for the per-call cache_ttl overrides, where None already means "never expire"
+_DEFAULT_TTL: Any = object()
+
+def _copy_results(results: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Copy cached search results so callers can't modify the cached dicts."""
+    return [dict(result) for result in results]
+
+@functools.lru_cache(maxsize=4096)
+def _is_blocked(url_key: str) -> bool:
+    """Memoized blocklist verdict; lru_cache can't cache the exception itself."""
+    try:
+        check_blocklisted_url(url_key)
+    except ValueError:
+        return True
+    return False
+
+def _check_url(url: str) -> None:
+    """Raise ValueError if the URL is blocklisted, like check_blocklisted_url but cached."""
+    # Only the host matters for the verdict, so case variants can share an entry
+    if _is_blocked(url.lower()):
+        raise ValueError(f"Blocked URL: {url}")
+
+# One client per API key, shared by all OpenAIWebSearch instances so they reuse
+# one connection pool instead of each opening its own
+_CLIENT_CACHE: Dict[str, "OpenAI"] = {}
+
+def _get_client(api_key: str) -> "OpenAI":
+    """Return the shared OpenAI client for an API key, creating it on first use."""
+    client = _CLIENT_CACHE.get(api_key)
+    if client is None:
+        import httpx
+        from openai import DefaultHttpxClient, OpenAI
+        
+        client = OpenAI(
+            api_key=api_key,
+            max_retries=2,
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            http_client=DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            ),
+        )
+        _CLIENT_CACHE[api_key] = client
+    return client
+
+# Fixed instructions for simulated searches. Sent as the first message, unchanged
+# between calls, so the provider can reuse it as a cached prompt prefix.
+_SYSTEM_SEARCH = """You simulate web searches. For each query, return plausible search results as a JSON object in this format:
+
+```json
+{
+    "results": [
+        {
+            "title": "Result title",
+            "url": "https://example.com/result-path",
+            "snippet": "Brief description of what this result contains..."
+        },
+        ...
+    ]
+}
+```
+
+Rules:
+1. Generate realistic titles, URLs, and snippets
+2. Use real domain names of reputable sites that would have information on this topic
+3. Make URLs look realistic with proper paths
+4. Snippets should be informative and relevant to the query
+5. Return exactly the number of results asked for
+6. Return ONLY the JSON object, no other text"""
+
+# Per-call prompts, filled in with str.format_map()
+_SEARCH_PROMPT_TEMPLATE = 'Simulate a web search for: "{query}"\nReturn exactly {num_results} results.'
+
+_CONTENT_PROMPT_TEMPLATE = """
+            Simulate the main content of a webpage at this URL: {url}
+            
+            Based on the URL, generate plausible, informative content that might be found on this page.
+            Focus on:
+            1. The main textual content (articles, information, etc.)
+            2. A realistic structure with sections and paragraphs
+            3. Relevant information to what the URL suggests
+            4. Factual information where possible
+            
+            Don't include navigation menus, comments, ads, or other non-content elements.
+            Write at least 3-4 paragraphs of realistic content.
+            """
+
+def _supports_structured_outputs(model: str) -> bool:
+    # The first gpt-4o snapshot predates structured outputs
+    return model.startswith(("gpt-4o", "gpt-4.1")) and model != "gpt-4o-2024-05-13"
+
+# Models that predate JSON mode (response_format={"type": "json_object"})
+_NO_JSON_MODE_MODELS = ("gpt-4", "gpt-4-0314", "gpt-4-0613", "gpt-3.5-turbo-0301", "gpt-3.5-turbo-0613")
+
+def _supports_json_mode(model: str) -> bool:
+    return model not in _NO_JSON_MODE_MODELS and not model.startswith(("gpt-4-32k", "gpt-3.5-turbo-16k"))
+
+# Placeholder hosts whose pages are answered with a fixed text instead of a model call
+_TRIVIAL_HOSTS = frozenset({"example.com", "www.example.com", "localhost"})
+_TRIVIAL_CONTENT = "Example domain. This domain is for use in illustrative examples."
+
+def _trivial_content(url: str) -> Optional[str]:
+    """Fixed content for placeholder URLs, or None if the URL needs the model."""
+    host = urlparse(url).hostname or ""
+    if host in _TRIVIAL_HOSTS or host.endswith(".invalid"):
+        return _TRIVIAL_CONTENT
+    return None
+
+# Result returned when a search response can't be parsed; callers get their own copy
+_SEARCH_ERROR_ENTRY = {"title": "Search error", "url": "", "snippet": "Failed to parse search results"}
+
+# Fenced ```json block in a model response
+_JSON_BLOCK_RE = re.compile(r'```json\s*([\s\S]*?)\s*```')
+# Characters that matter when matching brackets in JSON text
+_JSON_TOKEN_RE = re.compile(r'[\[\]"\\]')
+# Start of an array of objects, so bracketed prose such as "see [1]" is skipped
+_JSON_ARRAY_START_RE = re.compile(r'\[\s*\{')
+
+def _find_json_array(text: str) -> Optional[Tuple[int, int]]:
+    """Locate the first complete top-level JSON array of objects in text.
+    
+    Counts brackets outside of strings, so brackets inside titles or snippets
+    and trailing text after the array don't throw it off. Runs in a single
+    linear pass that jumps between bracket, quote and backslash characters.
+    
+    Returns:
+        (start, end) slice bounds of the array, or None if there isn't a complete one
+    """
+    start_match = _JSON_ARRAY_START_RE.search(text)
+    if start_match is None:
+        return None
+    start = start_match.start()
+    depth = 0
+    in_string = False
+    skip = -1  # Position of a character escaped by a backslash
+    for match in _JSON_TOKEN_RE.finditer(text, start):
+        pos = match.start()
+        if pos == skip:
+            continue
+        char = text[pos]
+        if char == '\\':
+            if in_string:
+                skip = pos + 1
+        elif char == '"':
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif char == '[':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return start, pos + 1
+    return None
+
 class OpenAIWebSearch:
-    """Implementation of WebSearch using OpenAI's capabilities."""
+    """Implementation of WebSearch using OpenAI's capabilities.
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o"):
+    Results are cached in memory. `search` and `get_content` reuse results
+    for identical calls. With `semantic_threshold` set, `search` also reuses
+    the results of an earlier query whose embedding is close enough to the new one.
+    """
+    
+    _JSON_BLOCK_RE = _JSON_BLOCK_RE
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o",
+                 cache_ttl: Optional[float] = 3600,
+                 cache_size: int = 1024,
+                 semantic_threshold: Optional[float] = None,
+                 embedding_model: str = "text-embedding-3-small"):
         """Initialize the OpenAI web search client.
         
         Args:
             api_key: OpenAI API key (optional, will use env var if not provided)
             model: OpenAI model to use for completions
+            cache_ttl: Seconds to keep cached results, None to keep them for the client's lifetime
+            cache_size: Maximum number of cached results; the oldest are evicted first
+            semantic_threshold: Cosine similarity above which a cached search is reused
+                for a different query (e.g. 0.92), None to only reuse identical queries.
+                Each uncached search then costs an extra embedding request.
+            embedding_model: OpenAI model used to embed queries for the semantic cache
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable or pass it to the constructor.")
         
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = _get_client(self.api_key)
         self.model = model
+        # Let the API guarantee the result shape, or at least parseable JSON, where the model supports it
+        self.structured_outputs = _supports_structured_outputs(model)
+        self.json_mode = _supports_json_mode(model)
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.semantic_threshold = semantic_threshold
+        self.embedding_model = embedding_model
+        
+        # Exact-match cache: key -> (expiry time or None, result)
+        self._exact: Dict[str, Tuple[Optional[float], Any]] = {}
+        # Semantic cache for searches: (normalized query embedding, num_results, exact-cache key)
+        self._emb_index: List[Tuple["np.ndarray", int, str]] = []
+    
+    def _cache_key(self, *parts: Any) -> str:
+        """Exact-match cache key for the model plus a call's arguments."""
+        return hashlib.sha256("|".join(map(str, (self.model, *parts))).encode("utf-8")).hexdigest()
+    
+    def _cache_get(self, key: str) -> Any:
+        """Return the cached result for a key, or None if it's missing or expired."""
+        entry = self._exact.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and time.time() > expires_at:
+            del self._exact[key]
+            return None
+        return value
+    
+    def _ttl(self, cache_ttl: Optional[float]) -> Optional[float]:
+        """Resolve a per-call cache_ttl override against the client's default."""
+        return self.cache_ttl if cache_ttl is _DEFAULT_TTL else cache_ttl
+    
+    def _cache_put(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        now = time.time()
+        self._exact.pop(key, None)
+        if len(self._exact) >= self.cache_size:
+            # Expired entries are otherwise only dropped when read, so clear them out first
+            self._exact = {k: entry for k, entry in self._exact.items()
+                           if entry[0] is None or entry[0] > now}
+            # Then evict the oldest entries (dicts keep insertion order)
+            while len(self._exact) >= self.cache_size:
+                del self._exact[next(iter(self._exact))]
+        self._exact[key] = (now + ttl if ttl is not None else None, value)
     
-    def search(self, query: str, num_results: int = 5) -> List[Dict[str, str]]:
+    def _embed(self, text: str) -> Optional["np.ndarray"]:
+        """Return the L2-normalized embedding of a query, or None if embedding fails."""
+        import numpy as np
+        
+        try:
+            response = self.client.embeddings.create(model=self.embedding_model, input=text)
+        except Exception as e:
+            print(f"Embedding error: {str(e)}")
+            return None
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+    
+    def _semantic_lookup(self, vector: "np.ndarray", num_results: int) -> Any:
+        """Return cached results of the most similar earlier search, if similar enough."""
+        import numpy as np
+        
+        # Drop entries whose results have expired
+        self._emb_index = [entry for entry in self._emb_index if self._cache_get(entry[2]) is not None]
+        candidates = [(v, key) for v, n, key in self._emb_index if n == num_results]
+        if not candidates:
+            return None
+        # Dot products of normalized vectors are cosine similarities
+        similarities = np.stack([v for v, _ in candidates]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] > self.semantic_threshold:
+            return self._cache_get(candidates[best][1])
+        return None
+    
+    def search(self, query: str, num_results: int = 5,
+               cache_ttl: Optional[float] = _DEFAULT_TTL) -> List[Dict[str, str]]:
         """Perform a web search simulation using OpenAI's LLM capabilities.
         
         Note: This is a simulated search that generates plausible results
@@ -31,73 +291,116 @@ class OpenAIWebSearch:
         Args:
             query: The search query
             num_results: Number of results to return (default 5)
+            cache_ttl: Seconds to cache these results, None to never expire them;
+                defaults to the client's cache_ttl
             
         Returns:
             List of search results with title, url, and snippet
         """
+        key = self._cache_key("search", query, num_results)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return _copy_results(cached)
+        
+        vector = self._embed(query) if self.semantic_threshold is not None else None
+        if vector is not None:
+            cached = self._semantic_lookup(vector, num_results)
+            if cached is not None:
+                return _copy_results(cached)
+        
         try:
-            # Create a prompt asking for simulated search results
-            prompt = f"""
-            Simulate a web search for: "{query}"
-            
-            Return {num_results} plausible search results in this format:
-            
-            ```json
-            [
-                {{
-                    "title": "Result title",
-                    "url": "https://example.com/result-path",
-                    "snippet": "Brief description of what this result contains..."
-                }},
-                ...
-            ]
-            ```
-            
-            Rules:
-            1. Generate realistic titles, URLs, and snippets
-            2. Use real domain names of reputable sites that would have information on this topic
-            3. Make URLs look realistic with proper paths
-            4. Snippets should be informative and relevant to the query
-            5. Return exactly {num_results} results
-            6. Return ONLY the JSON array, no other text
-            """
-            
             # Create a completion
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7
-            )
+            request = self._search_request(query, num_results)
+            if self.structured_outputs:
+                response = self.client.beta.chat.completions.parse(**request)
+            else:
+                response = self.client.chat.completions.create(**request)
             
-            content = response.choices[0].message.content
+            message = response.choices[0].message
             
-            # Extract the JSON part using regex
-            json_match = re.search(r'```json\s*([\s\S]*?)\s*```', content)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # If no code block, try to find array directly
-                json_match = re.search(r'\[\s*\{.*\}\s*\]', content, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-                else:
-                    # Fallback to the entire content
-                    json_str = content
-            
-            # Clean up the string and parse JSON
+            # Read the results
             try:
-                results = json.loads(json_str)
-                return results[:num_results]  # Ensure we don't exceed requested count
-            except json.JSONDecodeError as e:
+                results = self._read_results(message)[:num_results]  # Ensure we don't exceed requested count
+                # Only successful searches are cached
+                self._cache_put(key, results, self._ttl(cache_ttl))
+                if vector is not None:
+                    self._emb_index.append((vector, num_results, key))
+                return _copy_results(results)
+            except ValueError as e:
+                # Both json.JSONDecodeError and orjson.JSONDecodeError subclass ValueError
                 print(f"JSON parse error: {e}")
-                print(f"Content received: {content}")
-                return [{"title": "Search error", "url": "", "snippet": "Failed to parse search results"}]
+                print(f"Content received: {message.content}")
+                return [dict(_SEARCH_ERROR_ENTRY)]
                 
         except Exception as e:
             print(f"Search error: {str(e)}")
             return [{"title": "Search error", "url": "", "snippet": str(e)}]
     
-    def get_content(self, url: str) -> Optional[str]:
+    def _search_request(self, query: str, num_results: int) -> Dict[str, Any]:
+        """Keyword arguments for the chat completion that simulates a search."""
+        # Only the query and result count change between calls
+        prompt = _SEARCH_PROMPT_TEMPLATE.format_map({"query": query, "num_results": num_results})
+        request = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": _SYSTEM_SEARCH},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0.7,
+        }
+        if self.structured_outputs:
+            from app.web_search.schemas import SearchResults
+            
+            # Used with beta.chat.completions.parse(), which validates the response against it
+            request["response_format"] = SearchResults
+        elif self.json_mode:
+            request["response_format"] = {"type": "json_object"}
+        return request
+    
+    def _read_results(self, message: Any) -> List[Dict[str, str]]:
+        """Get the result list from a search completion's message.
+        
+        Raises:
+            ValueError: If the message holds no usable result list
+        """
+        if self.structured_outputs:
+            # Already validated against SearchResults by the API and the SDK
+            parsed = message.parsed
+            if parsed is None:
+                raise ValueError(message.refusal or "Response has no parsed results")
+            return [result.model_dump() for result in parsed.results]
+        return self._parse_results(message.content)
+    
+    def _parse_results(self, content: str) -> List[Dict[str, str]]:
+        """Parse the result list out of a search response.
+        
+        Raises:
+            ValueError: If the response holds no parseable result list
+        """
+        # JSON mode responses are exactly one JSON object; others need the JSON found first
+        data = _loads(content if self.json_mode else self._extract_json(content))
+        if isinstance(data, dict):
+            data = data.get("results")
+        if not isinstance(data, list):
+            raise ValueError("Response has no list of results")
+        return data
+    
+    def _extract_json(self, content: str) -> str:
+        """Return the JSON part of a free-text search response."""
+        # Cheap substring check first; most unfenced responses never reach the regex
+        if '```json' in content:
+            json_match = self._JSON_BLOCK_RE.search(content)
+            if json_match:
+                return json_match.group(1)
+        # If no code block, find the results array directly
+        bounds = _find_json_array(content)
+        if bounds:
+            return content[bounds[0]:bounds[1]]
+        # Fallback to the entire content
+        return content
+    
+    def get_content(self, url: str, cache_ttl: Optional[float] = _DEFAULT_TTL,
+                    max_chars: Optional[int] = None) -> Optional[str]:
         """Simulate fetching content from a webpage using OpenAI.
         
         Note: This is a simulation that generates plausible content
@@ -105,42 +408,249 @@ class OpenAIWebSearch:
         
         Args:
             url: The URL to simulate content from
+            cache_ttl: Seconds to cache this content, None to never expire it;
+                defaults to the client's cache_ttl
+            max_chars: Stop generating once this many characters have arrived; the
+                page is then returned as generated so far (at least max_chars long)
             
         Returns:
             Simulated string content of the webpage
         """
         try:
             # Check if the URL is blocked
-            check_blocklisted_url(url)
+            _check_url(url)
             
-            # Create a prompt asking for simulated webpage content
-            prompt = f"""
-            Simulate the main content of a webpage at this URL: {url}
+            # Placeholder domains (which simulated searches often return) need no model call
+            trivial = _trivial_content(url)
+            if trivial is not None:
+                return trivial
             
-            Based on the URL, generate plausible, informative content that might be found on this page.
-            Focus on:
-            1. The main textual content (articles, information, etc.)
-            2. A realistic structure with sections and paragraphs
-            3. Relevant information to what the URL suggests
-            4. Factual information where possible
+            # Only identical URLs share content; similar URLs can be different pages
+            key = self._cache_key("content", url)
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
             
-            Don't include navigation menus, comments, ads, or other non-content elements.
-            Write at least 3-4 paragraphs of realistic content.
-            """
+            # Create a prompt asking for simulated webpage content
+            prompt = self._content_prompt(url)
             
             # Create a completion
-            response = self.client.chat.completions.create(
+            request = dict(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
                 max_tokens=1000
             )
+            if max_chars is None:
+                response = self.client.chat.completions.create(**request)
+                content, complete = response.choices[0].message.content, True
+            else:
+                # Stream so we can stop paying for tokens the caller won't read
+                stream = self.client.chat.completions.create(**request, stream=True)
+                content, complete = self._read_stream(stream, max_chars)
             
-            return response.choices[0].message.content
+            # Pages cut short by max_chars aren't cached
+            if content and complete:
+                self._cache_put(key, content, self._ttl(cache_ttl))
+            return content
             
         except ValueError as e:
             print(f"URL blocked: {url}, {str(e)}")
             return None
         except Exception as e:
             print(f"Error simulating content from {url}: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+    
+    def get_contents(self, urls: List[str], cache_ttl: Optional[float] = _DEFAULT_TTL,
+                     max_chars: Optional[int] = None) -> List[Optional[str]]:
+        """Simulate fetching content from several webpages concurrently.
+        
+        Every URL gets its own request and all of them are in flight at once,
+        so the batch takes about as long as the slowest page.
+        
+        Args:
+            urls: The URLs to simulate content from
+            cache_ttl: Seconds to cache the content, None to never expire it;
+                defaults to the client's cache_ttl
+            max_chars: Stop generating each page once this many characters have arrived
+            
+        Returns:
+            Simulated content for each URL, in order; None where the URL is
+            blocked or the request failed
+        """
+        return asyncio.run(self.aget_contents(urls, cache_ttl, max_chars))
+    
+    async def aget_contents(self, urls: List[str], cache_ttl: Optional[float] = _DEFAULT_TTL,
+                            max_chars: Optional[int] = None) -> List[Optional[str]]:
+        """Async version of `get_contents`, for callers already running an event loop."""
+        from openai import AsyncOpenAI
+        
+        # A client per batch: async connections can't outlive the event loop they were opened on
+        async with AsyncOpenAI(api_key=self.api_key) as aclient:
+            return await asyncio.gather(*(self._aget_content(aclient, url, cache_ttl, max_chars)
+                                          for url in urls))
+    
+    async def research(self, topics: List[str], n_per: int = 3, max_concurrency: int = 20,
+                       max_chars: Optional[int] = None,
+                       cache_ttl: Optional[float] = _DEFAULT_TTL) -> Dict[str, Dict[str, Any]]:
+        """Search several topics and fetch their results' pages as one pipeline.
+        
+        All searches start at once, and each topic's page fetches start as
+        soon as its search comes back, so parsing and fetching overlap with
+        the searches still in flight.
+        
+        Args:
+            topics: The topics to search for
+            n_per: Number of search results (and pages) per topic
+            max_concurrency: Maximum number of OpenAI requests in flight at once
+            max_chars: Stop generating each page once this many characters have arrived
+            cache_ttl: Seconds to cache the searches and pages, None to never expire them;
+                defaults to the client's cache_ttl
+            
+        Returns:
+            For each topic, its "search_results" and a "contents" dict mapping
+            each result URL to its simulated content (None if unavailable)
+        """
+        from openai import AsyncOpenAI
+        
+        # A repeated topic would replace the first one's entries and leave its page fetches unawaited
+        topics = list(dict.fromkeys(topics))
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async with AsyncOpenAI(api_key=self.api_key) as aclient:
+            async def search_topic(topic: str) -> Tuple[str, List[Dict[str, str]]]:
+                async with semaphore:
+                    return topic, await self._asearch(aclient, topic, n_per, cache_ttl)
+            
+            async def fetch_page(url: str) -> Optional[str]:
+                async with semaphore:
+                    return await self._aget_content(aclient, url, cache_ttl, max_chars)
+            
+            findings: Dict[str, Dict[str, Any]] = {}
+            page_tasks: Dict[str, List[Tuple[str, asyncio.Task]]] = {}
+            for next_search in asyncio.as_completed([search_topic(topic) for topic in topics]):
+                topic, results = await next_search
+                findings[topic] = {"search_results": results, "contents": {}}
+                page_tasks[topic] = [
+                    (result["url"], asyncio.create_task(fetch_page(result["url"])))
+                    for result in results if result.get("url")
+                ]
+            
+            for topic, tasks in page_tasks.items():
+                for url, task in tasks:
+                    findings[topic]["contents"][url] = await task
+        
+        # Same order as the topics that were passed in
+        return {topic: findings[topic] for topic in topics}
+    
+    async def _asearch(self, aclient: "AsyncOpenAI", query: str, num_results: int,
+                       cache_ttl: Optional[float] = _DEFAULT_TTL) -> List[Dict[str, str]]:
+        """Async counterpart of `search` using the given client.
+        
+        Only identical queries are served from the cache; the semantic tier
+        needs an extra embedding round-trip that would delay the pipeline.
+        """
+        key = self._cache_key("search", query, num_results)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return _copy_results(cached)
+        
+        try:
+            request = self._search_request(query, num_results)
+            if self.structured_outputs:
+                response = await aclient.beta.chat.completions.parse(**request)
+            else:
+                response = await aclient.chat.completions.create(**request)
+            results = self._read_results(response.choices[0].message)[:num_results]
+            self._cache_put(key, results, self._ttl(cache_ttl))
+            return _copy_results(results)
+        except ValueError as e:
+            print(f"JSON parse error: {e}")
+            return [dict(_SEARCH_ERROR_ENTRY)]
+        except Exception as e:
+            print(f"Search error: {str(e)}")
+            return [{"title": "Search error", "url": "", "snippet": str(e)}]
+    
+    async def _aget_content(self, aclient: "AsyncOpenAI", url: str, cache_ttl: Optional[float] = _DEFAULT_TTL,
+                            max_chars: Optional[int] = None) -> Optional[str]:
+        """Async counterpart of `get_content` using the given client."""
+        try:
+            # Blocked URLs return before making a request
+            _check_url(url)
+            
+            trivial = _trivial_content(url)
+            if trivial is not None:
+                return trivial
+            
+            key = self._cache_key("content", url)
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+            
+            request = dict(
+                model=self.model,
+                messages=[{"role": "user", "content": self._content_prompt(url)}],
+                temperature=0.7,
+                max_tokens=1000
+            )
+            if max_chars is None:
+                response = await aclient.chat.completions.create(**request)
+                content, complete = response.choices[0].message.content, True
+            else:
+                stream = await aclient.chat.completions.create(**request, stream=True)
+                content, complete = await self._aread_stream(stream, max_chars)
+            
+            if content and complete:
+                self._cache_put(key, content, self._ttl(cache_ttl))
+            return content
+            
+        except ValueError as e:
+            print(f"URL blocked: {url}, {str(e)}")
+            return None
+        except Exception as e:
+            print(f"Error simulating content from {url}: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _content_prompt(url: str) -> str:
+        """Prompt asking the model to simulate the content of a webpage."""
+        return _CONTENT_PROMPT_TEMPLATE.format_map({"url": url})
+    
+    @staticmethod
+    def _read_stream(stream, max_chars: int) -> Tuple[str, bool]:
+        """Collect a streamed completion, stopping once max_chars characters have arrived.
+        
+        Returns:
+            The text received and whether the completion finished rather than being cut off
+        """
+        parts: List[str] = []
+        length = 0
+        try:
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    length += len(delta)
+                    if length >= max_chars:
+                        return "".join(parts), False
+            return "".join(parts), True
+        finally:
+            # Closing ends the response early instead of reading the remaining tokens
+            stream.close()
+    
+    @staticmethod
+    async def _aread_stream(stream, max_chars: int) -> Tuple[str, bool]:
+        """Async counterpart of `_read_stream`."""
+        parts: List[str] = []
+        length = 0
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    length += len(delta)
+                    if length >= max_chars:
+                        return "".join(parts), False
+            return "".join(parts), True
+        finally:
+            await stream.close()
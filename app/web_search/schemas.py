@@ -0,0 +1,13 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class SearchResult(BaseModel):
+    """One simulated search result."""
+    title: str
+    url: str
+    snippet: str
+
+class SearchResults(BaseModel):
+    """Structured-output schema for a simulated search."""
+    results: List[SearchResult]
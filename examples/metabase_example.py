@@ -10,40 +10,55 @@ This example shows how to:
 """
 
 import os
+import functools
+from importlib import resources
 from pathlib import Path
+from typing import Optional
 from app.metabase_agent.metabase import MetabaseAgent
 
-def run_investment_report():
+# Query text is read once at import; {weeks} is filled in per run
+_RECENT_INVESTMENTS_SQL = resources.files("examples.queries").joinpath("recent_investments.sql").read_text()
+
+# Directory for downloads, created once at import
+_DOWNLOADS = Path.cwd() / "downloads"
+_DOWNLOADS.mkdir(exist_ok=True)
+
+@functools.lru_cache(maxsize=1)
+def _get_agent() -> MetabaseAgent:
+    """
+    Returns the agent shared by all reports, so its browser and login session
+    are reused across calls. The agent closes its browser itself when the
+    interpreter exits.
+    """
+    # Set headless=False to see the browser UI during automation
+    return MetabaseAgent(headless=False)
+
+def run_investment_report(weeks: int = 2, agent: Optional[MetabaseAgent] = None):
     """
     Connects to Metabase, runs a query to get recent investments, and downloads the results.
     
+    Args:
+        weeks (int): How many weeks back to include investments from
+        agent (MetabaseAgent): Agent to run the query with; defaults to a shared one
+    
     Returns:
         str: Path to the downloaded CSV file
     """
     print("Connecting to Metabase and running investment report...")
     
-    # SQL query to get investments from the last 2 weeks
-    query = """
-select i.id, i.offering_id, i.status, i.amount, i.request_platform, i.created_date
-from primary_facade.investment i
-where i.created_date > now() - interval '2 week'
-order by i.created_date;
-"""
-
+    # SQL query to get investments from the last `weeks` weeks. Metabase only takes
+    # query text, so the value is inlined; with a database driver you would pass it
+    # as a bind parameter (cur.execute(sql, (weeks,))) so Postgres can reuse the plan.
+    query = _RECENT_INVESTMENTS_SQL.format(weeks=int(weeks))
     
-    # Create a directory for downloads if it doesn't exist
-    downloads_dir = Path.cwd() / "downloads"
-    downloads_dir.mkdir(exist_ok=True)
-    
-    # Initialize the Metabase agent
-    # Set headless=False to see the browser UI during automation
-    agent = MetabaseAgent(headless=False)
+    if agent is None:
+        agent = _get_agent()
     
     # Run the query and download results
     file_path = agent.run_query_and_download(
         sql_query=query,
         database="primary_facade",
-        download_path=str(downloads_dir)
+        download_path=str(_DOWNLOADS)
     )
     
     return file_path
@@ -0,0 +1,4 @@
+select i.id, i.offering_id, i.status, i.amount, i.request_platform, i.created_date
+from primary_facade.investment i
+where i.created_date > now() - interval '{weeks} week'
+order by i.created_date;
@@ -7,10 +7,14 @@ This example shows how to:
 3. Extract and interact with search results
 """
 
+import os
 import time
 from app.browser_agent.local_playwright import LocalPlaywrightBrowser
 from app.utils import show_image_cv2
 
+# Showing a screenshot blocks for its whole timeout; set SE_EXAMPLES_SHOW=1 to see them
+SHOW = os.getenv("SE_EXAMPLES_SHOW", "0") == "1"
+
 def perform_search(query, num_results=3):
     """
     Performs a web search and extracts the top results.
@@ -30,12 +34,12 @@ def perform_search(query, num_results=3):
         # Navigate to search engine
         browser.goto("https://www.bing.com")
         
-        # Wait for page to load
-        browser.wait(1000)
+        # Wait for the search box instead of a fixed delay
+        browser.wait_for("input[name='q']")
         
-        # Take a screenshot of the search page
-        screenshot = browser.screenshot()
-        show_image_cv2(screenshot, timeout=1)
+        # Show a screenshot of the search page
+        if SHOW:
+            show_image_cv2(browser.screenshot(), timeout=1)
         
         # Find and click the search box (approximate coordinates)
         browser.click(500, 300)
@@ -46,12 +50,12 @@ def perform_search(query, num_results=3):
         # Press Enter to search
         browser.keypress(["Enter"])
         
-        # Wait for results to load
-        browser.wait(2000)
+        # Wait for the first result instead of a fixed delay
+        browser.wait_for("#b_results li.b_algo")
         
-        # Take a screenshot of the results
-        screenshot = browser.screenshot()
-        show_image_cv2(screenshot, timeout=2)
+        # Show a screenshot of the results
+        if SHOW:
+            show_image_cv2(browser.screenshot(), timeout=2)
         
         # This is a placeholder - in a real application, you would:
         # 1. Extract the actual search results from the page
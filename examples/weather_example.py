@@ -8,10 +8,14 @@ This example shows how to:
 4. Extract weather information
 """
 
+import os
 import time
 from app.browser_agent.local_playwright import LocalPlaywrightBrowser
 from app.utils import show_image, show_image_cv2
 
+# Showing a screenshot blocks for its whole timeout; set SE_EXAMPLES_SHOW=1 to see them
+SHOW = os.getenv("SE_EXAMPLES_SHOW", "0") == "1"
+
 def check_weather(location):
     """
     Checks the weather for a given location using a browser.
@@ -32,12 +36,13 @@ def check_weather(location):
         # Wait for the page to load
         browser.wait(2000)  # 2 seconds
         
-        # Take a screenshot
-        screenshot = browser.screenshot()
+        # Take a screenshot, only needed when it will be shown
+        screenshot = browser.screenshot() if SHOW else None
         
         # Display the screenshot
-        print("Displaying screenshot (will close after 2 seconds)...")
-        show_image_cv2(screenshot, timeout=2)
+        if SHOW:
+            print("Displaying screenshot (will close after 2 seconds)...")
+            show_image_cv2(screenshot, timeout=2)
         
         # Print the current URL
         print(f"Current URL: {browser.get_current_url()}")
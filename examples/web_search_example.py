@@ -36,12 +36,14 @@ def perform_web_research(topic: str):
         print(f"   URL: {result['url']}")
         print(f"   {result['snippet']}")
     
-    # Fetch content from the first relevant result (simulated)
+    # Fetch content from the first result that has a URL (simulated)
     content = None
-    if search_results and search_results[0]['url']:
-        first_url = search_results[0]['url']
+    result_urls = [result['url'] for result in search_results if result['url']]
+    if result_urls:
+        first_url = result_urls[0]
         print(f"\nFetching content from: {first_url}...")
-        content = search_client.get_content(first_url)
+        # Only the first 500 characters are used, so stop generating the page there
+        content = search_client.get_content(first_url, max_chars=500)
         
         if content:
             print(f"\nContent excerpt (first 200 chars):")
@@ -54,7 +56,7 @@ def perform_web_research(topic: str):
         "topic": topic,
         "search_results": search_results,
         "content_sample": content[:500] if content else None,
-        "sources": [result['url'] for result in search_results if result['url']]
+        "sources": result_urls
     }
     
     return research_data